@@ -34,6 +34,38 @@ app_id = ''
 secret_id = ''
 ya_token = ''
 
+# List only files modified on disk since the last successful run
+LIST_ONLY_CHANGED = True
+
+# Extract mode: 'sync' - download files, then read them;
+# 'async' - download files concurrently and read each one as soon as it lands;
+# 'stream' - parse files while they are being downloaded, saving a local copy on the way
+EXTRACT_MODE = 'sync'
+
+# Retention policy for archived versions of exported files
+ARCHIVE_MAX_AGE_DAYS = 90
+ARCHIVE_MAX_BYTES = 20 * 2**30
+
+# Number of processes for parsing files in the 'sync' mode (None - parse in the main process)
+PARSE_WORKERS = os.cpu_count()
+
+# Keep parsed files in a columnar cache, so unchanged files are not parsed again in the 'sync' mode
+USE_PARSE_CACHE = True
+PARSE_CACHE_MAX_BYTES = 50 * 2**30
+
+# String columns whose number of distinct values is at most this share of the rows are stored as categorical.
+# Near-identifier columns (e.g., website IDs) take more memory as categorical, so the share is small
+CATEGORY_MAX_CARDINALITY_RATIO = 0.05
+
+# Store categorical columns in the database as integer codes with lookup tables
+USE_LOOKUP_TABLES = False
+
+# Read pickle ('.pkl') exports; loading a pickle file can run arbitrary code, so enable it only for trusted files
+READ_PICKLE_FILES = False
+
+# Start time of this run
+run_started_at = datetime.now(timezone.utc)
+
 # Connecting to Yandex Disk
 y = yadisk.YaDisk(app_id, secret_id, ya_token)
 
@@ -64,41 +96,89 @@ else:
 ###### Reload the module after changes
 reload(some_functions)
 
+# Pickle exports are read only if enabled above
+some_functions.allow_pickle_files(READ_PICKLE_FILES)
+
 print()
 
-# Read files from the disk, check for their presence in the local directory, and download them if they are not present
-list_of_files, load_path, files_with_dates = some_functions.create_file_list_and_load_path(y)
+if EXTRACT_MODE == 'async':
+    # Create a folder for loading data, then list, download and read files in one asynchronous pass
+    load_path = os.path.join(os.getcwd(), 'aif_etl')
+    os.makedirs(load_path, exist_ok=True)
+    os.chdir(load_path)
+    dobro_files, other_files, dobro_dataframes, other_dataframes = some_functions.run_async_extract(
+        app_id, secret_id, ya_token, load_path)
+elif EXTRACT_MODE == 'stream':
+    # Create a folder for loading data, list files on disk and parse them while they are being downloaded
+    load_path = os.path.join(os.getcwd(), 'aif_etl')
+    os.makedirs(load_path, exist_ok=True)
+    os.chdir(load_path)
+    list_of_files = list(some_functions.iter_disk_files(y, 'aif_etl'))
+    dobro_files, other_files, dobro_dataframes, other_dataframes = some_functions.read_disk_files_streaming(
+        y, list_of_files, load_path)
+else:
+    # Read files from the disk, check for their presence in the local directory, and download them if they are not present
+    list_of_files, load_path, files_with_dates = some_functions.create_file_list_and_load_path(
+        y, since_last_run=LIST_ONLY_CHANGED)
 
-print()
+    print()
 
-# Check for new files, and if they exist, download them. Also check if old files need to be updated (by upload date).
-# If the upload date in the local directory is earlier than on the disk, update the files, and move the outdated files to the archive.
-some_functions.check_and_update_files(list_of_files, load_path)
+    # Check for new files, and if they exist, download them. Also check if old files need to be updated (by content hash).
+    # If the hash reported by the disk differs from the one in the manifest, update the files, and compress the outdated files into the archive.
+    some_functions.check_and_update_files(y, list_of_files, load_path)
 
-print()
+    print()
 
-# Read files
-dobro_files, other_files, dobro_dataframes, other_dataframes = some_functions.read_and_sort_files(load_path)
+    # Read files
+    dobro_files, other_files, dobro_dataframes, other_dataframes = some_functions.read_and_sort_files(
+        load_path, max_workers=PARSE_WORKERS, use_cache=USE_PARSE_CACHE, cache_max_bytes=PARSE_CACHE_MAX_BYTES)
 
 print()
 
-# Concatenate 'dobro' files into customers
-customers = pd.concat(dobro_dataframes, ignore_index=True)
+# Remove archived versions that fall outside the retention policy
+some_functions.evict_archive(os.path.join(load_path, 'archive'), max_age_days=ARCHIVE_MAX_AGE_DAYS,
+                             max_total_bytes=ARCHIVE_MAX_BYTES)
 
-# Check for the presence of the file named 'Заказы' in the folder and read it
-#orders = pd.read_csv(os.path.join(load_path, other_files[0]), sep=';') if other_files else pd.DataFrame()
-orders_file = next((f for f in other_files if 'Заказы' in f), None)
-if orders_file:
-    orders = pd.read_csv(os.path.join(load_path, orders_file), sep=';')
+print()
+
+# Missing values are counted file by file while the datasets are collected, so they are not counted again
+# by full scans of the datasets
+customers_null_stats = some_functions.NullStatsAccumulator()
+orders_null_stats = some_functions.NullStatsAccumulator()
+
+# Concatenate 'dobro' files into customers (the per-file data is released as it is collected).
+# The exports overlap in time, so actions repeated in several files are removed by the action identifier
+customers = some_functions.concat_frames(dobro_dataframes, max_cardinality_ratio=CATEGORY_MAX_CARDINALITY_RATIO,
+                                         key_columns=some_functions.CUSTOMERS_KEY_COLUMNS, names=dobro_files,
+                                         null_stats=customers_null_stats, release_frames=True)
+
+# Take every orders export among the other files (orders may be split, e.g. by quarter) by its header.
+# The parts have already been read in parallel; they are moved out of other_dataframes and unioned once,
+# removing order lines repeated in several files
+orders_indices = [i for i, f in enumerate(other_files)
+                  if some_functions.classify_file(os.path.join(load_path, f)) == 'orders']
+orders_files = [other_files[i] for i in orders_indices]
+orders_parts = [other_dataframes.pop(i) for i in reversed(orders_indices)][::-1]
+other_files = [f for f in other_files if f not in orders_files]
+if orders_parts:
+    orders = some_functions.concat_frames(orders_parts, max_cardinality_ratio=CATEGORY_MAX_CARDINALITY_RATIO,
+                                          key_columns=some_functions.ORDERS_KEY_COLUMNS, names=orders_files,
+                                          null_stats=orders_null_stats, release_frames=True)
+    print(f"Orders read from {len(orders_files)} file(s): {orders_files}")
 else:
-    print("File 'Заказы' not found in folder.")
+    print("Orders file not found in folder.")
     orders = pd.DataFrame()
 
-# Create copies of the datasets before transformations to monitor the percentage of data deletion
-temp1 = customers.copy()
-display('Number of rows in customers before changes:', len(temp1))
-temp2 = orders.copy()
-display('Number of rows in orders before changes:', len(temp2))
+# Columns of the source files, used to report the columns that were not read
+customers_header = some_functions.read_dataset_header(load_path, dobro_files)
+orders_header = some_functions.read_dataset_header(load_path, orders_files)
+
+# Record snapshots of the datasets (columns, data types, rows, missing values) before transformations
+# to monitor the percentage of data deletion; the data itself is not copied
+customers_snapshot = some_functions.DatasetSnapshot(customers, 'customers', null_stats=customers_null_stats)
+display('Number of rows in customers before changes:', len(customers_snapshot))
+orders_snapshot = some_functions.DatasetSnapshot(orders, 'orders', null_stats=orders_null_stats)
+display('Number of rows in orders before changes:', len(orders_snapshot))
 
 print()
 
@@ -106,49 +186,41 @@ print()
 print('DATA PREPROCESSING IN CUSTOMERS:') 
 
 ## Displaying main information about the customers dataset
-some_functions.display_dataset_info(customers)
+some_functions.display_dataset_info(customers, customers_null_stats)
 
 print()
 
-### Removing columns from the customers dataset
-### Columns to be removed
-columns_to_drop = ['CustomerActionActionTemplateIdsSystemName', 'CustomerActionBrandIdsSystemName',
-                   'CustomerActionChannelIdsSystemName']
-
-### Removing specified columns from the customers dataset
-customers = customers.drop(columns=columns_to_drop, errors='ignore')
+### Columns CustomerActionActionTemplateIdsSystemName, CustomerActionBrandIdsSystemName, CustomerActionChannelIdsSystemName
+### and CustomerActionChannelIdsExternalId (duplicates CustomerActionChannelName) are not read from the files at all
+### (see some_functions.CUSTOMERS_COLUMNS_TO_DROP)
 
-### Removing columns with 100% missing values
-some_functions.remove_empty_columns(customers)
-
-### Take a look at the data in the columns CustomerActionChannelIdsExternalId and CustomerActionChannelName
-customers[['CustomerActionChannelIdsExternalId', 'CustomerActionChannelName']].sample(5)
-
-### Remove the CustomerActionChannelIdsExternalId column as it duplicates CustomerActionChannelName
-customers.drop(columns = ['CustomerActionChannelIdsExternalId'], inplace=True)
+### Columns that duplicate other columns (identical data or values mapped one-to-one) are found automatically
+### and added to the drop list; columns used in sqls_script are never removed
+customers_transforms = some_functions.with_dropped_columns(
+    some_functions.CUSTOMERS_TRANSFORMS,
+    some_functions.find_redundant_columns(customers, some_functions.COLUMNS_USED_IN_QUERIES, 'customers'))
 
-### Report on the removal of columns from customers
-some_functions.find_removed_columns(temp1, customers)
+### Drops, casts, renames, derived columns and filters are declared in some_functions.CUSTOMERS_TRANSFORMS
+### and applied in one pass
+customers = some_functions.apply_transforms(customers, customers_transforms, customers_null_stats)
 
-print()
+### Removing columns with 100% missing values
+some_functions.remove_empty_columns(customers, customers_null_stats)
 
-#### Change the data type of CustomerActionDateTimeUtc and CustomerActionCreationDateTimeUtc to datetime
-cols_to_change = ['CustomerActionDateTimeUtc', 'CustomerActionCreationDateTimeUtc']
-for col in cols_to_change:
-    customers[col] = pd.to_datetime(customers[col], errors='coerce')
-#### Change the data type to integer in CustomerActionChannelIdsMindboxId
-cols_to_change = ['CustomerActionChannelIdsMindboxId']
-for col in cols_to_change:
-    customers[col] = pd.to_numeric(customers[col], errors='coerce').astype('int')
+### Report on the removal of columns and on data type changes in customers, generated from the transform spec.
+#### CustomerActionDateTimeUtc and CustomerActionCreationDateTimeUtc (datetime) and CustomerActionChannelIdsMindboxId (integer)
+#### already have the data types from the schema registry, so the casts of the transform spec do not convert them again
+some_functions.report_transforms(customers_transforms, customers_header)
 
-#### Report on data type changes in customers
-some_functions.find_changed_data_types(temp1, customers) 
+### Report on the removal of columns with 100% missing values from customers
+some_functions.find_removed_columns(
+    some_functions.transformed_columns(customers_transforms, customers_header), customers)
 
 print()   
 
 ##### Calculate the proportion of missing data in the columns
 print('Proportion of missing values in customers:')
-print(pd.DataFrame(round(customers.isna().mean() * 100, 5)).sort_values(by = 0))
+print(pd.DataFrame(round(customers_null_stats.missing_percentages(), 5)).sort_values(by = 0))
 
 print()
 
@@ -156,79 +228,58 @@ print()
 print('DATA PREPROCESSING IN ORDERS:') 
 
 ## Displaying main information about the orders dataset
-some_functions.display_dataset_info(orders)
+some_functions.display_dataset_info(orders, orders_null_stats)
 
 print()
 
-### Remove columns from the orders dataset that have 100% missing values
-some_functions.remove_empty_columns(orders)
-
-### The data in the columns OrderLinePriceOfLine and OrderLineBasePricePerItem are likely identical. 
-### We will check this information, and if it is true, we will remove the OrderLineBasePricePerItem column.
-### First, we will remove missing values from OrderLineBasePricePerItem.
-orders_cleaned = orders.dropna(subset=['OrderLineBasePricePerItem'])
-orders_cleaned['OrderLineBasePricePerItem'] = orders_cleaned['OrderLineBasePricePerItem'].astype(int)
-if orders_cleaned['OrderLinePriceOfLine'].equals(orders_cleaned['OrderLineBasePricePerItem']):
-    print('Data in columns OrderLinePriceOfLine and OrderLineBasePricePerItem is the same.')
-    ### Removing the column OrderLineBasePricePerItem
-    orders.drop(columns=['OrderLineBasePricePerItem'], inplace=True)
-else:
-    print('Data in columns OrderLinePriceOfLine and OrderLineBasePricePerItem is different.')
-### Checking the OrderDeliveryCost column for unique values
-display(orders['OrderDeliveryCost'].unique())
-print()
-display(orders['OrderDeliveryCost'].value_counts())
+### The data in the columns OrderLinePriceOfLine and OrderLineBasePricePerItem are likely identical.
+### Columns that duplicate other columns are found automatically and added to the drop list;
+### OrderLinePriceOfLine and the columns used in sqls_script are never removed
+orders_transforms = some_functions.with_dropped_columns(
+    some_functions.ORDERS_TRANSFORMS,
+    some_functions.find_redundant_columns(orders, some_functions.COLUMNS_USED_IN_QUERIES, 'orders'))
 
-### Removing the OrderDeliveryCost column
-orders.drop(columns = ['OrderDeliveryCost'], inplace=True)
+### Drops, casts, renames, derived columns and filters are declared in some_functions.ORDERS_TRANSFORMS
+### and applied in one pass
+orders = some_functions.apply_transforms(orders, orders_transforms, orders_null_stats)
 
-### Check the columns OrderLineNumber for unique values
-display(orders['OrderLineNumber'].unique())
-print()
-display(orders['OrderLineLineNumber'].unique())
-
-### Remove these columns, as this is likely part of a boxed solution and this information is not needed
-orders.drop(columns = ['OrderLineNumber', 'OrderLineLineNumber'], inplace=True)
-
-### Take a look at the data in the columns OrderFirstActionChannelIdsExternalId and OrderFirstActionChannelName
-orders[['OrderFirstActionChannelIdsExternalId', 'OrderFirstActionChannelName']].sample(5)
-
-### Remove the column OrderFirstActionChannelIdsExternalId as it duplicates OrderFirstActionChannelName
-orders.drop(columns = ['OrderFirstActionChannelIdsExternalId'], inplace=True)
-
-print()
+### Remove columns from the orders dataset that have 100% missing values
+some_functions.remove_empty_columns(orders, orders_null_stats)
 
-### Report on the removal of columns from orders
-some_functions.find_removed_columns(temp2, orders)
+### Columns OrderDeliveryCost (a single value), OrderLineNumber and OrderLineLineNumber (part of a boxed solution)
+### and OrderFirstActionChannelIdsExternalId (duplicates OrderFirstActionChannelName) are not read from the files at all
+### (see some_functions.ORDERS_COLUMNS_TO_DROP)
 
 print()
 
-#### Change the data type in OrderFirstActionDateTimeUtc
-orders['OrderFirstActionDateTimeUtc'] = pd.to_datetime(orders['OrderFirstActionDateTimeUtc'], errors='coerce')
+### Report on the removal of columns and on data type changes in orders, generated from the transform spec.
+#### OrderFirstActionDateTimeUtc already has the datetime data type from the schema registry
+some_functions.report_transforms(orders_transforms, orders_header)
 
-#### Report on changes in data types in orders
-some_functions.find_changed_data_types(temp2, orders)
+### Report on the removal of columns with 100% missing values from orders
+some_functions.find_removed_columns(
+    some_functions.transformed_columns(orders_transforms, orders_header), orders)
 
 print()
 
 ##### Calculate the proportion of missing data in the columns
 print('Proportion of missing values in orders:')
-print(pd.DataFrame(round(orders.isna().mean() * 100, 5)).sort_values(by = 0))
+print(pd.DataFrame(round(orders_null_stats.missing_percentages(), 5)).sort_values(by = 0))
 
 print()
 
-# Compare our data by the number of rows at the end of data processing in the datasets
-a1, b1 = len(temp1), len(customers)
-print('Rows in customers before::', len(temp1), ', after:', len(customers), ', deleted in %:',
-      round((a1 - b1) / a1 * 100, 2))
+# Compare our data with the snapshots at the end of data processing in the datasets
+customers_snapshot.diff(some_functions.DatasetSnapshot(customers, 'customers', null_stats=customers_null_stats))
+
+print()
 
-a2, b2 = len(temp2), len(orders)
-print('Rows in customers before::', len(temp2), ', after:', len(orders), ', deleted in %:',
-      round((a2 - b2) / a2 * 100, 2))
+orders_snapshot.diff(some_functions.DatasetSnapshot(orders, 'orders', null_stats=orders_null_stats))
 print()
 
 # Create a database, connect to it, and upload the datasets to it
-some_functions.create_and_load_datasets(customers, orders)
+# Remember the start of this run, so the next run lists only files changed after it
+if some_functions.create_and_load_datasets(customers, orders, use_lookup_tables=USE_LOOKUP_TABLES):
+    some_functions.mark_successful_run(load_path, run_started_at)
 
 
 
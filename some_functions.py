@@ -4,24 +4,494 @@ import seaborn as sns
 import sqlalchemy as sa
 from sqlalchemy import create_engine, inspect
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.ipc
+import pyarrow.compute as pc
+import pyarrow.parquet
+import pyarrow.feather
 import os
+import io
+import shutil
+import json
+import hashlib
+import gzip
+import threading
+import tempfile
+import urllib.request
+import yadisk
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from tqdm import tqdm
 from datetime import datetime, timedelta, timezone
 import sqlite3 as sl
 from IPython.display import display, HTML
 
+# zstd compression for the archive is used when the module is installed, gzip otherwise
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# DuckDB is used for the out-of-core transform backend when the module is installed
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Lock for the archive index, which can be updated from several download threads
+archive_lock = threading.Lock()
+
+# Extensions of the exported files that are downloaded and read
+SUPPORTED_EXTENSIONS = ('.csv', '.txt', '.pkl', '.parquet', '.feather')
+
+# Loading a pickle file can run arbitrary code, so pickle files from the disk are read only when this is
+# enabled (see allow_pickle_files) for trusted exports
+READ_PICKLE_FILES = False
+
+# Columns removed from the customers dataset during preprocessing. They are not read from the files at all.
+# CustomerActionChannelIdsExternalId duplicates CustomerActionChannelName
+CUSTOMERS_COLUMNS_TO_DROP = ['CustomerActionActionTemplateIdsSystemName', 'CustomerActionBrandIdsSystemName',
+                             'CustomerActionChannelIdsSystemName', 'CustomerActionChannelIdsExternalId']
+
+# Columns of the customers dataset converted to datetime and integer
+# (CustomerActionIdsMindboxId is the key of an action, so it has the same type in every reading path)
+CUSTOMERS_DATETIME_COLUMNS = ['CustomerActionDateTimeUtc', 'CustomerActionCreationDateTimeUtc']
+CUSTOMERS_INTEGER_COLUMNS = ['CustomerActionIdsMindboxId', 'CustomerActionChannelIdsMindboxId']
+
+# Columns removed from the orders dataset during preprocessing. They are not read from the files at all.
+# OrderDeliveryCost holds a single value, OrderLineNumber and OrderLineLineNumber belong to the boxed solution,
+# OrderFirstActionChannelIdsExternalId duplicates OrderFirstActionChannelName
+ORDERS_COLUMNS_TO_DROP = ['OrderDeliveryCost', 'OrderLineNumber', 'OrderLineLineNumber',
+                          'OrderFirstActionChannelIdsExternalId']
+
+# Columns read from the files (None - all columns except the removed ones)
+CUSTOMERS_COLUMNS_TO_KEEP = None
+ORDERS_COLUMNS_TO_KEEP = None
+
+# Columns of the orders dataset converted to datetime
+ORDERS_DATETIME_COLUMNS = ['OrderFirstActionDateTimeUtc']
+
+# Key of an order line, used to remove duplicates when orders are exported in several files (e.g., by quarter)
+ORDERS_KEY_COLUMNS = ['OrderIdsWebsiteID', 'OrderLineProductIdsWebsite']
+
+# Identifier of a customer action, used to remove actions repeated in overlapping 'dobro' exports
+# (actions without it are compared by all columns)
+CUSTOMERS_KEY_COLUMNS = ['CustomerActionIdsMindboxId']
+
+# Columns used by the queries in sqls_script.py; they are never removed as redundant.
+# OrderLinePriceOfLine is kept over OrderLineBasePricePerItem when their data is the same
+COLUMNS_USED_IN_QUERIES = ['CustomerActionCustomerIdsMindboxId', 'CustomerActionDateTimeUtc', 'CustomerActionChannelName',
+                           'CustomerActionChannelUtmSource',
+                           'OrderCustomerIdsMindboxId', 'OrderFirstActionIdsMindboxId', 'OrderFirstActionDateTimeUtc',
+                           'OrderCustomFieldsNewyear', 'OrderCustomFieldsRecurrent', 'OrderIdsWebsiteID',
+                           'OrderLineStatusIdsExternalId', 'OrderTotalPrice', 'OrderLinePriceOfLine'] + \
+                          CUSTOMERS_KEY_COLUMNS + ORDERS_KEY_COLUMNS
+
+# Format of timestamps in the exports (ISO 8601, e.g. '2023-01-31 12:00:00.000')
+TIMESTAMP_FORMAT = pyarrow.csv.ISO8601
+
+# Formats tried in order when timestamps are parsed with pandas (values matching none of them are inferred)
+TIMESTAMP_FORMATS = ['%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f%z', '%Y-%m-%dT%H:%M:%S%z',
+                     '%Y-%m-%d']
+
+# Text values of boolean columns (the same values PyArrow accepts); other values become missing
+BOOL_VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+# Missing timestamp as int64 nanoseconds
+NAT_NANOSECONDS = np.iinfo(np.int64).min
+
+# Mixed into hashes of whole rows, so they do not collide with hashes of keys
+ROW_HASH_SALT = np.uint64(0x9E3779B97F4A7C15)
+
+# Schema registry: data type, timestamp format and nullability of every column of the exports (see README.md)
+CUSTOMERS_SCHEMA = {
+    'CustomerActionIdsMindboxId': {'type': 'int64', 'nullable': False},
+    'CustomerActionActionTemplateIdsSystemName': {'type': 'string', 'nullable': True},
+    'CustomerActionActionTemplateName': {'type': 'string', 'nullable': True},
+    'CustomerActionDateTimeUtc': {'type': 'timestamp', 'format': TIMESTAMP_FORMAT, 'nullable': False},
+    'CustomerActionCreationDateTimeUtc': {'type': 'timestamp', 'format': TIMESTAMP_FORMAT, 'nullable': True},
+    'CustomerActionBrandIdsSystemName': {'type': 'string', 'nullable': True},
+    'CustomerActionChannelIdsMindboxId': {'type': 'int64', 'nullable': False},
+    'CustomerActionChannelName': {'type': 'string', 'nullable': True},
+    'CustomerActionChannelIdsExternalId': {'type': 'string', 'nullable': True},
+    'CustomerActionChannelIdsSystemName': {'type': 'string', 'nullable': True},
+    'CustomerActionChannelUtmCampaign': {'type': 'string', 'nullable': True},
+    'CustomerActionChannelUtmSource': {'type': 'string', 'nullable': True},
+    'CustomerActionChannelUtmMedium': {'type': 'string', 'nullable': True},
+    'CustomerActionChannelUtmContent': {'type': 'string', 'nullable': True},
+    'CustomerActionChannelUtmTerm': {'type': 'string', 'nullable': True},
+    'CustomerActionCustomerIdsBackendID': {'type': 'string', 'nullable': True},
+    'CustomerActionCustomerIdsWebsiteID': {'type': 'string', 'nullable': True},
+    'CustomerActionCustomerIdsMindboxId': {'type': 'int64', 'nullable': False}
+}
+
+ORDERS_SCHEMA = {
+    'OrderIdsMindboxId': {'type': 'int64', 'nullable': True},
+    'OrderFirstActionIdsMindboxId': {'type': 'int64', 'nullable': True},
+    'OrderFirstActionDateTimeUtc': {'type': 'timestamp', 'format': TIMESTAMP_FORMAT, 'nullable': True},
+    'OrderFirstActionChannelIdsMindboxId': {'type': 'int64', 'nullable': True},
+    'OrderFirstActionChannelIdsExternalId': {'type': 'string', 'nullable': True},
+    'OrderAreaIdsExternalId': {'type': 'string', 'nullable': True},
+    'OrderTransactionIdsExternalId': {'type': 'string', 'nullable': True},
+    'OrderDeliveryCost': {'type': 'float64', 'nullable': True},
+    'OrderFirstActionChannelName': {'type': 'string', 'nullable': True},
+    'OrderTotalPrice': {'type': 'float64', 'nullable': True},
+    'OrderIdsBackendID': {'type': 'string', 'nullable': True},
+    'OrderIdsWebsiteID': {'type': 'string', 'nullable': True},
+    'OrderCustomFieldsNewyear': {'type': 'bool', 'nullable': True},
+    'OrderCustomFieldsNextPaymentDate': {'type': 'timestamp', 'format': TIMESTAMP_FORMAT, 'nullable': True},
+    'OrderCustomFieldsRecurrent': {'type': 'bool', 'nullable': True},
+    'OrderCustomFieldsRepeatPayment': {'type': 'bool', 'nullable': True},
+    'OrderLineProductIdsWebsite': {'type': 'string', 'nullable': True},
+    'OrderLineProductName': {'type': 'string', 'nullable': True},
+    'OrderLineQuantity': {'type': 'float64', 'nullable': True},
+    'OrderLineBasePricePerItem': {'type': 'float64', 'nullable': True},
+    'OrderLinePriceOfLine': {'type': 'float64', 'nullable': True},
+    'OrderLineStatusIdsExternalId': {'type': 'string', 'nullable': True},
+    'OrderLineGiftCardAmount': {'type': 'float64', 'nullable': True},
+    'OrderLineGiftCardStatusIdsSystemName': {'type': 'string', 'nullable': True},
+    'OrderLineNumber': {'type': 'string', 'nullable': True},
+    'OrderLineLineNumber': {'type': 'string', 'nullable': True},
+    'OrderCustomerIdsBackendID': {'type': 'string', 'nullable': True},
+    'OrderCustomerIdsWebsiteID': {'type': 'string', 'nullable': True},
+    'OrderCustomerIdsMindboxId': {'type': 'int64', 'nullable': False}
+}
+
+# Arrow types for the types used in the schema registry
+ARROW_TYPES = {
+    'string': pa.string(),
+    'int64': pa.int64(),
+    'float64': pa.float64(),
+    'bool': pa.bool_(),
+    'timestamp': pa.timestamp('ns')
+}
+
+# Transform specs: columns to drop, casts to types of the schema registry, renames (old -> new),
+# derived columns (name -> function of the transformed frame) and row filters (functions returning a mask).
+# Each spec is compiled by compile_transforms into one pass over a dataset or a chunk of it
+CUSTOMERS_TRANSFORMS = {
+    'drop': CUSTOMERS_COLUMNS_TO_DROP,
+    'cast': {**dict.fromkeys(CUSTOMERS_DATETIME_COLUMNS, 'timestamp'),
+             **dict.fromkeys(CUSTOMERS_INTEGER_COLUMNS, 'int64')},
+    'rename': {},
+    'derive': {},
+    'filter': []
+}
+
+ORDERS_TRANSFORMS = {
+    'drop': ORDERS_COLUMNS_TO_DROP,
+    'cast': {**dict.fromkeys(ORDERS_DATETIME_COLUMNS, 'timestamp'),
+             **dict.fromkeys(ORDERS_KEY_COLUMNS, 'string')},
+    'rename': {},
+    'derive': {},
+    'filter': []
+}
+
+
+class TimestampCache:
+    """
+    Keeps parsed timestamps of strings seen in earlier chunks as int64 nanoseconds in UTC,
+    so repeated values are not parsed again. The cache is cleared when it grows beyond max_size.
+    """
+
+    def __init__(self, max_size=1000000):
+        self.values = pd.Series(dtype='int64')
+        self.max_size = max_size
+
+    def lookup(self, strings):
+        """
+        Returns the cached nanoseconds of the strings and a mask of the strings found in the cache.
+        """
+        positions = self.values.index.get_indexer(strings)
+        found = positions >= 0
+        nanoseconds = np.full(len(strings), NAT_NANOSECONDS, dtype='int64')
+        nanoseconds[found] = self.values.to_numpy()[positions[found]]
+        return nanoseconds, found
+
+    def update(self, strings, nanoseconds):
+        """
+        Adds parsed strings to the cache.
+        """
+        new_values = pd.Series(nanoseconds, index=strings, dtype='int64')
+        if len(self.values) + len(new_values) > self.max_size:
+            self.values = new_values.iloc[-self.max_size:]
+        else:
+            self.values = pd.concat([self.values, new_values])
+
+
+# Define a function to parse timestamps with the known formats of the exports
+def parse_timestamps(values, formats=TIMESTAMP_FORMATS, cache=None, column=None):
+    """
+    Parses timestamps to UTC (kept timezone-naive) with nanosecond precision. Every distinct string is parsed
+    once, and with a cache once per run across chunks. The known formats are applied vectorized, each to the values
+    not parsed yet. Values matching none of them are parsed one by one with format='mixed', so each of them
+    may have its own format (pandas otherwise infers one format from the first value and applies it to all).
+    Reports how many values could not be parsed and were set to NaT.
+
+    :param values: Series of strings or timestamps
+    :param formats: strptime formats tried in order
+    :param cache: TimestampCache reused between calls; not cached if None
+    :param column: Name used in the report; the name of the series if None
+    :return: Series of datetime64[ns]
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        if getattr(values.dt, 'tz', None) is not None:
+            values = values.dt.tz_convert('UTC').dt.tz_localize(None)
+        return values.astype('datetime64[ns]')
+
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Index(np.asarray(uniques, dtype=object)).astype(str)
+
+    if cache is not None:
+        nanoseconds, parsed = cache.lookup(uniques)
+    else:
+        nanoseconds, parsed = np.full(len(uniques), NAT_NANOSECONDS, dtype='int64'), np.zeros(len(uniques), dtype=bool)
+    pending = ~parsed
+
+    for fmt in list(formats) + [None]:
+        if not pending.any():
+            break
+        positions = np.flatnonzero(pending)
+        if fmt is None:
+            result = pd.to_datetime(uniques[positions], format='mixed', errors='coerce', utc=True)
+        else:
+            result = pd.to_datetime(uniques[positions], format=fmt, errors='coerce', utc=True)
+        result = result.tz_convert(None).astype('datetime64[ns]').asi8
+        matched = result != NAT_NANOSECONDS
+        nanoseconds[positions[matched]] = result[matched]
+        pending[positions[matched]] = False
+
+    if cache is not None:
+        cache.update(uniques[~parsed], nanoseconds[~parsed])
+
+    # Missing values (code -1) take the NaT appended at the end, which also works for a column without values
+    result = np.append(nanoseconds, NAT_NANOSECONDS)[codes]
+    coerced = int(((codes >= 0) & (result == NAT_NANOSECONDS)).sum())
+    if coerced:
+        print(f"Column '{column or values.name}': {coerced} values could not be parsed as timestamps and were set to NaT.")
+    return pd.Series(result.view('datetime64[ns]'), index=values.index, name=values.name)
+
+
+# Define a function to cast a column to a type of the schema registry
+def cast_series(values, type_name, cache=None):
+    """
+    Casts a column to a type of the schema registry; values that cannot be converted become missing.
+    Columns that already have the requested type are returned as they are.
+
+    :param values: Series
+    :param type_name: 'timestamp', 'int64', 'float64', 'bool' or 'string'
+    :param cache: TimestampCache used for timestamps
+    :return: Series of the requested type
+    """
+    if type_name == 'timestamp':
+        return parse_timestamps(values, cache=cache)
+    if type_name == 'int64':
+        if pd.api.types.is_integer_dtype(values):
+            return values
+        values = pd.to_numeric(values, errors='coerce')
+        return values.astype('Int64' if values.isna().any() else 'int64')
+    if type_name == 'float64':
+        if pd.api.types.is_float_dtype(values):
+            return values
+        return pd.to_numeric(values, errors='coerce').astype('float64')
+    if type_name == 'bool':
+        if pd.api.types.is_bool_dtype(values):
+            return values
+        return values.astype('string').str.strip().str.lower().map(BOOL_VALUES).astype('boolean')
+    if isinstance(values.dtype, (pd.CategoricalDtype, pd.StringDtype)):
+        return values
+    # Whole floats (integer columns with missing values) are written without '.0', so the same value
+    # gets the same text whichever type pandas inferred for the column of a file or a chunk
+    if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+        values = values.astype('Int64')
+    return values.astype('string')
+
+
+# Define a function to compile a transform spec into a single-pass function
+def compile_transforms(spec):
+    """
+    Compiles a transform spec (see CUSTOMERS_TRANSFORMS) into a function that drops, casts and renames
+    columns, adds derived columns and filters rows in one pass, building the result from the columns
+    of the input instead of modifying it column by column. The same function is applied to a whole
+    dataset or to every chunk of it.
+
+    :param spec: Transform spec
+    :return: Function taking a DataFrame and returning the transformed DataFrame
+    """
+    drop = set(spec.get('drop', ()))
+    casts = dict(spec.get('cast', {}))
+    rename = dict(spec.get('rename', {}))
+    derive = dict(spec.get('derive', {}))
+    filters = list(spec.get('filter', ()))
+    # Timestamps parsed in one chunk are not parsed again in the following ones
+    caches = {col: TimestampCache() for col, type_name in casts.items() if type_name == 'timestamp'}
+
+    def transform(df):
+        columns = {}
+        for col in df.columns:
+            if col in drop:
+                continue
+            columns[rename.get(col, col)] = cast_series(df[col], casts[col], caches.get(col)) if col in casts \
+                else df[col]
+        result = pd.DataFrame(columns, index=df.index, copy=False)
+
+        for name, func in derive.items():
+            result[name] = func(result)
+        if filters:
+            result = result[np.logical_and.reduce([np.asarray(func(result), dtype=bool) for func in filters])]
+        return result
+
+    return transform
+
+
+# Define a function to apply a transform spec to a dataset
+def apply_transforms(df, spec, null_stats=None):
+    """
+    Applies a transform spec to a dataset in one pass (see compile_transforms). The statistics of missing
+    values are kept up to date: only converted and derived columns are counted again, and the whole
+    dataset only when the spec filters rows.
+
+    :param df: DataFrame
+    :param spec: Transform spec
+    :param null_stats: NullStatsAccumulator of the dataset, updated in place
+    :return: Transformed DataFrame
+    """
+    result = compile_transforms(spec)(df)
+
+    if null_stats is not None:
+        if spec.get('filter'):
+            null_stats.reset(result)
+        else:
+            rename = spec.get('rename', {})
+            converted_columns = [rename.get(col, col) for col in spec.get('cast', {})
+                                 if col in df.columns and rename.get(col, col) in result.columns
+                                 and df[col].dtype != result[rename.get(col, col)].dtype]
+            null_stats.retain([col for col in result.columns if col not in spec.get('derive', {})], rename)
+            null_stats.recount(result, converted_columns + list(spec.get('derive', {})))
+            null_stats.retain(result.columns)
+    return result
+
+
+# Define a function to get the columns produced by a transform spec
+def transformed_columns(spec, header):
+    """
+    Returns the columns a transform spec produces from the columns of the source files.
+
+    :param spec: Transform spec
+    :param header: Columns of the source files
+    :return: List of columns after the transforms
+    """
+    rename = spec.get('rename', {})
+    return [rename.get(col, col) for col in header if col not in spec.get('drop', ())] + list(spec.get('derive', {}))
+
+
+# Define a function to report the changes made by a transform spec
+def report_transforms(spec, header):
+    """
+    Reports the columns removed and the columns whose data type is changed by a transform spec,
+    relative to the columns of the source files (read as text), without copying the dataset.
+
+    :param spec: Transform spec
+    :param header: Columns of the source files
+    :return: Tuple (removed columns, columns with changed data types)
+    """
+    removed_columns = find_removed_columns(header, transformed_columns(spec, header))
+
+    rename = spec.get('rename', {})
+    drop = set(spec.get('drop', ()))
+    changed_columns = [rename.get(col, col) for col, type_name in spec.get('cast', {}).items()
+                       if col in header and col not in drop and type_name != 'string']
+    if changed_columns:
+        print('Changed data types in columns:', changed_columns)
+    else:
+        print('No changes in data types')
+
+    return removed_columns, changed_columns
+
+
+# Define a function to find columns that duplicate other columns
+def find_redundant_columns(df, protected=(), name='dataset'):
+    """
+    Finds pairs of columns with identical data or with values mapped one-to-one (e.g., an ID and its name).
+    Every column is factorized and hashed once. Factorize numbers the values in the order they first occur,
+    so two columns are mapped one-to-one exactly when their codes are equal, and identical when their hashes
+    are also equal; only columns with the same number of distinct values are compared. Missing values count
+    as a separate value. Columns with fewer than two distinct values are skipped (see remove_empty_columns).
+    Any two columns with a distinct value in every row (e.g., an ID and a random number) are trivially
+    mapped one-to-one, so such columns are reported only when their data is identical.
+    Of every pair, the later column is removed unless it is protected.
+
+    :param df: DataFrame
+    :param protected: Columns that are never removed (e.g., COLUMNS_USED_IN_QUERIES)
+    :param name: Name of the dataset used in the report
+    :return: List of redundant columns
+    """
+    codes = {}
+    hashes = {}
+    columns_by_cardinality = {}
+    for col in df.columns:
+        # Missing values get a code of their own in the order they occur
+        col_codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+        cardinality = len(uniques)
+        if cardinality > 1:
+            codes[col] = col_codes
+            hashes[col] = pd.util.hash_pandas_object(df[col], index=False).to_numpy()
+            columns_by_cardinality.setdefault(cardinality, []).append(col)
+
+    redundant_columns = []
+    for cardinality, columns in columns_by_cardinality.items():
+        for i, first in enumerate(columns):
+            for second in columns[i + 1:]:
+                if first in redundant_columns or second in redundant_columns:
+                    continue
+                if not np.array_equal(codes[first], codes[second]):
+                    continue
+                identical = np.array_equal(hashes[first], hashes[second])
+                if cardinality == len(df) and not identical:
+                    continue
+
+                if second not in protected:
+                    dropped = second
+                elif first not in protected:
+                    dropped = first
+                else:
+                    dropped = None
+                print(f"{name}: columns '{first}' and '{second}' are "
+                      f"{'identical' if identical else 'mapped one-to-one'}; "
+                      f"{repr(dropped) + ' is removed' if dropped else 'both are used in queries and kept'}.")
+                if dropped:
+                    redundant_columns.append(dropped)
+
+    return redundant_columns
+
+
+# Define a function to add columns to the drop list of a transform spec
+def with_dropped_columns(spec, columns):
+    """
+    Returns a copy of a transform spec that also drops the given columns.
+
+    :param spec: Transform spec
+    :param columns: Columns to be dropped
+    :return: Transform spec
+    """
+    return {**spec, 'drop': list(spec.get('drop', ())) + [col for col in columns if col not in spec.get('drop', ())]}
+
 
 # Define a function that returns a list of removed columns after preprocessing
 def find_removed_columns(original_df, modified_df):
     """
     Compares the columns of the original and modified datasets and returns the names of removed columns.
+    Either dataset can also be given as a list of column names, e.g. the header of the source files.
     
-    :param original_df: Original dataset
-    :param modified_df: Modified dataset
+    :param original_df: Original dataset or list of its columns
+    :param modified_df: Modified dataset or list of its columns
     :return: List of removed columns
     """
-    original_columns = set(original_df.columns)
-    modified_columns = set(modified_df.columns)
+    original_columns = set(getattr(original_df, 'columns', original_df))
+    modified_columns = set(getattr(modified_df, 'columns', modified_df))
     
     # Determine removed columns
     removed_columns = list(original_columns - modified_columns)
@@ -69,13 +539,200 @@ def find_changed_data_types(original_df, modified_df):
     return changed_columns
 
 
+class NullStatsAccumulator:
+    """
+    Counts rows and missing values per column chunk by chunk, as the data is read, so the missing values
+    of a dataset are not counted again by full scans. Arrow tables report their null counts without a scan.
+    Gives the null counts, the proportion of missing values and the columns with 100% missing values.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.null_counts = {}
+
+    def update(self, data):
+        """
+        Adds the rows and missing values of a DataFrame, Arrow table or record batch.
+        Columns that are absent from the data count as missing in its rows.
+        """
+        if isinstance(data, (pa.Table, pa.RecordBatch)):
+            counts = {name: data.column(i).null_count for i, name in enumerate(data.schema.names)}
+            rows = data.num_rows
+        else:
+            counts = data.isna().sum().to_dict()
+            rows = len(data)
+
+        for col in self.null_counts:
+            if col not in counts:
+                self.null_counts[col] += rows
+        for col, count in counts.items():
+            self.null_counts[col] = self.null_counts.get(col, self.rows) + int(count)
+        self.rows += rows
+
+    def reset(self, df=None):
+        """
+        Clears the statistics, or replaces them with the statistics of a dataset.
+        """
+        self.rows = 0
+        self.null_counts = {}
+        if df is not None:
+            self.update(df)
+
+    def recount(self, df, columns):
+        """
+        Counts the missing values of the given columns of a dataset again, e.g. after their values were converted.
+        """
+        for col in columns:
+            self.null_counts[col] = int(df[col].isna().sum())
+
+    def retain(self, columns, rename=None):
+        """
+        Keeps the statistics of the given columns only (e.g., after columns were removed), renaming them if needed.
+        """
+        rename = rename or {}
+        null_counts = {rename.get(col, col): count for col, count in self.null_counts.items()}
+        self.null_counts = {col: null_counts[col] for col in columns if col in null_counts}
+
+    def counts(self):
+        """
+        Returns the number of missing values per column.
+        """
+        return pd.Series(self.null_counts, dtype='int64')
+
+    def missing_percentages(self):
+        """
+        Returns the proportion of missing values per column in %.
+        """
+        return self.counts() / self.rows * 100 if self.rows else self.counts().astype('float64')
+
+    def empty_columns(self):
+        """
+        Returns the columns with 100% missing values.
+        """
+        return [col for col, count in self.null_counts.items() if count == self.rows]
+
+
+class DatasetSnapshot:
+    """
+    Records the state of a dataset at a checkpoint (columns, data types, number of rows, missing values
+    and, optionally, a content hash of every column) without copying the data. Missing values are taken
+    from a NullStatsAccumulator when it is given. A snapshot can be passed
+    to find_removed_columns and find_changed_data_types in place of the dataset, and compared with
+    a later snapshot by diff.
+    """
+
+    def __init__(self, df, name='dataset', with_hashes=False, null_stats=None):
+        self.name = name
+        self.columns = df.columns.copy()
+        self.dtypes = df.dtypes.copy()
+        self.rows = len(df)
+        # Null counts are taken from the NullStatsAccumulator of the dataset when it is given
+        self.null_counts = null_stats.counts().reindex(df.columns, fill_value=0) if null_stats is not None \
+            else df.isna().sum()
+        # The sum of row hashes does not depend on the order of the rows
+        self.hashes = {col: int(pd.util.hash_pandas_object(df[col], index=False).sum())
+                       for col in df.columns} if with_hashes else None
+
+    def __len__(self):
+        return self.rows
+
+    def diff(self, other):
+        """
+        Prints the changes between this snapshot and a later one (or a dataset): removed and added
+        columns, changed data types, the number of deleted rows and the change in missing values.
+        Columns whose content changed are reported when both snapshots have hashes.
+
+        :param other: Later DatasetSnapshot or DataFrame
+        :return: Dictionary with the changes
+        """
+        if not isinstance(other, DatasetSnapshot):
+            other = DatasetSnapshot(other, self.name, with_hashes=self.hashes is not None)
+
+        common_columns = [col for col in self.columns if col in other.columns]
+        changes = {
+            'removed_columns': [col for col in self.columns if col not in other.columns],
+            'added_columns': [col for col in other.columns if col not in self.columns],
+            'changed_types': [col for col in common_columns if self.dtypes[col] != other.dtypes[col]],
+            'deleted_rows': self.rows - other.rows,
+            'changed_nulls': {col: int(other.null_counts[col] - self.null_counts[col]) for col in common_columns
+                              if other.null_counts[col] != self.null_counts[col]},
+            'changed_content': [col for col in common_columns if self.hashes[col] != other.hashes[col]]
+            if self.hashes is not None and other.hashes is not None else None
+        }
+
+        print(f"Changes in {self.name}:")
+        print('Removed columns:', changes['removed_columns'] or 'none')
+        if changes['added_columns']:
+            print('Added columns:', changes['added_columns'])
+        print('Changed data types in columns:', changes['changed_types'] or 'none')
+        print(f"Rows in {self.name} before:", self.rows, ', after:', other.rows, ', deleted in %:',
+              round(changes['deleted_rows'] / self.rows * 100, 2) if self.rows else 0)
+        if changes['changed_nulls']:
+            print('Change in the number of missing values:', changes['changed_nulls'])
+        if changes['changed_content']:
+            print('Columns with changed content:', changes['changed_content'])
+
+        return changes
+
+
+# Define a function to remove a table or a view from the database
+def drop_table_or_view(conn, name):
+    """
+    Removes a table or a view with the given name, whichever exists.
+
+    :param conn: Connection to the database
+    :param name: Name of the table or view
+    """
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ? AND type IN ('table', 'view')", (name,)).fetchone()
+    if row is not None:
+        conn.execute(f'DROP {row[0].upper()} "{name}"')
+
+
+# Define a function to load a dataset with categorical columns stored as integer codes
+def write_encoded_table(df, table_name, conn):
+    """
+    Loads a dataset into the database, storing every categorical column as integer codes with a lookup table
+    '<table>_<column>_lookup' (code, value). The data itself goes into '<table>_data', and a view named
+    after the table joins the lookup tables back, so queries can use the table as before.
+
+    :param df: Dataset with categorical columns
+    :param table_name: Name of the table (view) in the database
+    :param conn: Connection to the database
+    """
+    category_columns = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+
+    # Replace categories by their codes, missing values are stored as NULL
+    codes = {}
+    for col in category_columns:
+        col_codes = df[col].cat.codes.astype('Int32')
+        codes[col] = col_codes.mask(col_codes == -1)
+        lookup = pd.DataFrame({'code': range(len(df[col].cat.categories)), 'value': df[col].cat.categories})
+        lookup.to_sql(f'{table_name}_{col}_lookup', conn, if_exists='replace', index=False)
+    df.assign(**codes).to_sql(f'{table_name}_data', conn, if_exists='replace', index=False)
+
+    # Create a view that restores the original values
+    select_list = []
+    joins = []
+    for i, col in enumerate(df.columns):
+        if col in codes:
+            select_list.append(f'l{i}.value AS "{col}"')
+            joins.append(f'LEFT JOIN "{table_name}_{col}_lookup" l{i} ON d."{col}" = l{i}.code')
+        else:
+            select_list.append(f'd."{col}"')
+    drop_table_or_view(conn, table_name)
+    conn.execute(f'CREATE VIEW "{table_name}" AS SELECT {", ".join(select_list)} '
+                 f'FROM "{table_name}_data" d {" ".join(joins)}')
+
+
 # Define a function to create a database, connect to it, and load datasets into it
-def create_and_load_datasets(customers, orders):
+def create_and_load_datasets(customers, orders, use_lookup_tables=False):
     """
     Creates a connection to the database and loads the datasets.
 
     :param customers: Dataset of customers
     :param orders: Dataset of orders
+    :param use_lookup_tables: Whether to store categorical columns as integer codes with lookup tables
+    :return: True if the datasets were loaded, False otherwise
     """
     # Создаем соединение с базой данных
     db_path= 'aif.sql'
@@ -93,15 +750,25 @@ def create_and_load_datasets(customers, orders):
         # Create a connection to the database
         conn = sl.connect(db_path)
 
+        # The tables are rebuilt from all files, so the ledger of the incremental load no longer applies
+        drop_table_or_view(conn, 'etl_ledger')
+
         # Add datasets to the database
-        customers.to_sql('customers', conn, if_exists='replace', index=False)
-        orders.to_sql('orders', conn, if_exists='replace', index=False)
+        for table_name, df in [('customers', customers), ('orders', orders)]:
+            if use_lookup_tables:
+                write_encoded_table(df, table_name, conn)
+            else:
+                drop_table_or_view(conn, table_name)
+                df.to_sql(table_name, conn, if_exists='replace', index=False)
+        conn.commit()
 
         # Report
         print("Database created and datasets loaded successfully.")
+        return True
 
     except Exception as e:
         print(f"An error occurred: {e}")
+        return False
 
     finally:
         # Close the connection if it was opened
@@ -135,32 +802,549 @@ def execute_query(sql):
         conn.close()
 
 
+# Define a function to calculate the hash of a local file
+def calculate_file_hash(file_path, algorithm='md5', chunk_size=2**20):
+    """
+    Calculates the hash of a local file, reading it in chunks.
+
+    :param file_path: Path to the local file
+    :param algorithm: Name of the hash algorithm ('md5' or 'sha256')
+    :param chunk_size: Size of the chunks read from the file in bytes
+    :return: Hexadecimal digest of the file
+    """
+    file_hash = hashlib.new(algorithm)
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+# Define a function to check a downloaded file against the size and hash reported by the disk
+def verify_downloaded_file(file_path, file_info):
+    """
+    Checks that a downloaded file has the size and md5 hash reported by the disk.
+
+    :param file_path: Path to the downloaded file
+    :param file_info: Dictionary with the size and hashes of the file on disk
+    :raises ValueError: If the size or the hash of the file does not match
+    """
+    size = os.path.getsize(file_path)
+    if file_info.get('size') is not None and size != file_info['size']:
+        raise ValueError(f"expected {file_info['size']} bytes, got {size}")
+    if file_info.get('md5') and calculate_file_hash(file_path, 'md5') != file_info['md5']:
+        raise ValueError('md5 hash does not match the file on disk')
+
+
+# Define a function to download a file through a temporary .part file with resume support
+def download_file_resumable(y, file_info, local_file_path, chunk_size=2**20, link=None):
+    """
+    Downloads a file to a temporary '.part' file, continuing from the last downloaded byte
+    if a previous attempt was interrupted. The file is checked against the size and hash
+    reported by the disk and only then renamed to its final name, so a truncated file never
+    appears in the local folder.
+
+    :param y: Object used to download files (e.g., Yandex Disk API)
+    :param file_info: Dictionary with the path, size and hashes of the file on disk
+    :param local_file_path: Path where the file is saved in the local folder
+    :param chunk_size: Size of the chunks written to the file in bytes
+    :param link: Download link obtained in advance (e.g., by the asynchronous client)
+    """
+    part_path = local_file_path + '.part'
+    expected_size = file_info.get('size')
+
+    # Continue from the end of the previous attempt if it is still consistent with the file on disk
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if expected_size is not None and offset > expected_size:
+        offset = 0
+
+    if expected_size is None or offset < expected_size:
+        link = link or y.get_download_link(file_info['path'])
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        with urllib.request.urlopen(urllib.request.Request(link, headers=headers)) as response:
+            # If the server ignored the range, the file is written from the beginning
+            mode = 'ab' if offset and response.status == 206 else 'wb'
+            with open(part_path, mode) as file:
+                shutil.copyfileobj(response, file, chunk_size)
+
+    try:
+        verify_downloaded_file(part_path, file_info)
+    except ValueError:
+        # A corrupted .part file cannot be resumed, so the next attempt starts from scratch
+        os.remove(part_path)
+        raise
+
+    os.replace(part_path, local_file_path)
+
+
+# Define a function to download a single file with retries and exponential backoff
+def download_file_with_retry(y, file_info, local_file_path, retries=3, backoff=1.0):
+    """
+    Downloads a single file from disk, retrying failed attempts with exponential backoff.
+    Every retry continues the interrupted download instead of starting it again.
+
+    :param y: Object used to download files (e.g., Yandex Disk API)
+    :param file_info: Dictionary with the path, size and hashes of the file on disk
+    :param local_file_path: Path where the file is saved in the local folder
+    :param retries: Number of retries after the first failed attempt
+    :param backoff: Delay in seconds before the first retry, doubled for every next retry
+    :return: Dictionary with the file name, size in bytes, download time, throughput and number of attempts
+    """
+    file_name = os.path.basename(file_info['path'])
+
+    # The time includes failed attempts and delays, so the throughput is not overstated after retries
+    start = time.perf_counter()
+    for attempt in range(1, retries + 2):
+        try:
+            download_file_resumable(y, file_info, local_file_path)
+            break
+        except Exception as e:
+            if attempt > retries:
+                raise
+            delay = backoff * 2 ** (attempt - 1)
+            print(f"Error downloading file '{file_name}' (attempt {attempt}): {e}. Retrying in {delay} s...")
+            time.sleep(delay)
+
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(local_file_path)
+
+    return {
+        'file': file_name,
+        'bytes': size,
+        'seconds': seconds,
+        'bytes_per_second': size / seconds if seconds > 0 else float('inf'),
+        'attempts': attempt
+    }
+
+
+# Define a function to download several files in parallel
+def download_files_concurrently(y, files_to_download, load_path, max_workers=4, retries=3, backoff=1.0):
+    """
+    Downloads files from disk to the local folder using a bounded pool of threads.
+    The largest files are started first, so the total time is close to the time of the slowest file.
+
+    :param y: Object used to download files (e.g., Yandex Disk API)
+    :param files_to_download: List of dictionaries with the path (and size, if known) of files on disk
+    :param load_path: Path to the local directory for downloading files
+    :param max_workers: Maximum number of simultaneous downloads
+    :param retries: Number of retries for each file
+    :param backoff: Delay in seconds before the first retry
+    :return: List of dictionaries with download statistics for each downloaded file
+    """
+    # Start with the largest files so they do not end up at the tail of the queue
+    files_to_download = sorted(files_to_download, key=lambda file_info: file_info.get('size') or 0, reverse=True)
+
+    results = []
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for file_info in files_to_download:
+            local_file_path = os.path.join(load_path, os.path.basename(file_info['path']))
+            future = executor.submit(download_file_with_retry, y, file_info, local_file_path, retries, backoff)
+            futures[future] = file_info
+
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            file_name = os.path.basename(futures[future]['path'])
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error downloading file '{file_name}': {e}")
+                continue
+
+            results.append(result)
+            print(f"Downloaded '{file_name}': {result['bytes'] / 2**20:.2f} MB in {result['seconds']:.1f} s "
+                  f"({result['bytes_per_second'] / 2**20:.2f} MB/s)")
+
+    # Report the total throughput
+    total_seconds = time.perf_counter() - start
+    total_bytes = sum(result['bytes'] for result in results)
+    if results:
+        print(f"Downloaded {len(results)} of {len(files_to_download)} files: {total_bytes / 2**20:.2f} MB "
+              f"in {total_seconds:.1f} s ({total_bytes / 2**20 / max(total_seconds, 1e-9):.2f} MB/s)")
+
+    return results
+
+
+# Define a function to read the manifest of downloaded files
+def load_manifest(load_path):
+    """
+    Reads the manifest with the hashes and sizes reported by the disk for every downloaded file.
+
+    :param load_path: Path to the local directory with downloaded files
+    :return: Dictionary with the manifest, empty if the manifest does not exist yet
+    """
+    manifest_path = os.path.join(load_path, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return {'files': {}}
+
+    with open(manifest_path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+# Define a function to save the manifest of downloaded files
+def save_manifest(load_path, manifest):
+    """
+    Saves the manifest to the local directory, replacing the previous version atomically.
+
+    :param load_path: Path to the local directory with downloaded files
+    :param manifest: Dictionary with the manifest
+    """
+    manifest_path = os.path.join(load_path, 'manifest.json')
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+
+# Define a function to add downloaded files to the manifest
+def record_files_in_manifest(manifest, files):
+    """
+    Stores the hashes, size and modification date reported by the disk for the given files.
+
+    :param manifest: Dictionary with the manifest
+    :param files: List of dictionaries with information about files on disk
+    """
+    for file_info in files:
+        file_name = os.path.basename(file_info['path'])
+        manifest['files'][file_name] = {
+            'path': file_info['path'],
+            'md5': file_info.get('md5'),
+            'sha256': file_info.get('sha256'),
+            'size': file_info.get('size'),
+            'upload_date': str(file_info.get('upload_date'))
+        }
+        # A file downloaded after a failed attempt no longer blocks the run
+        manifest.get('failed_files', {}).pop(file_name, None)
+
+
+# Define a function to remember a file that could not be downloaded
+def record_failed_file(manifest, file_info):
+    """
+    Keeps a file that could not be downloaded in the manifest until it is downloaded by a later run.
+    While the manifest holds failed files, the run is not marked successful, so the file keeps
+    being listed when only files changed since the last successful run are requested.
+
+    :param manifest: Dictionary with the manifest
+    :param file_info: Dictionary with information about the file on disk
+    """
+    manifest.setdefault('failed_files', {})[os.path.basename(file_info['path'])] = file_info['path']
+
+
+# Define a function to check whether a file has changed on disk since it was downloaded
+def is_file_unchanged(file_info, manifest, load_path):
+    """
+    Compares the hash reported by the disk with the hash stored in the manifest.
+    A file without a manifest entry (e.g., downloaded before the manifest existed) is compared
+    with the local copy once, and the result is stored in the manifest.
+
+    :param file_info: Dictionary with information about the file on disk
+    :param manifest: Dictionary with the manifest
+    :param load_path: Path to the local directory with downloaded files
+    :return: True if the local copy matches the file on disk, False otherwise
+    """
+    file_name = os.path.basename(file_info['path'])
+    local_file_path = os.path.join(load_path, file_name)
+
+    # A missing or truncated local copy always has to be downloaded
+    if not os.path.exists(local_file_path):
+        return False
+    if file_info.get('size') is not None and os.path.getsize(local_file_path) != file_info['size']:
+        return False
+
+    entry = manifest['files'].get(file_name)
+    if entry is None:
+        if file_info.get('md5') and calculate_file_hash(local_file_path, 'md5') == file_info['md5']:
+            record_files_in_manifest(manifest, [file_info])
+            return True
+        return False
+
+    if file_info.get('sha256') and entry.get('sha256'):
+        return file_info['sha256'] == entry['sha256']
+    return file_info.get('md5') is not None and file_info.get('md5') == entry.get('md5')
+
+
+# Define a function to download files and add the successfully downloaded ones to the manifest
+def download_and_record_files(y, files_to_download, load_path, manifest, max_workers=4):
+    """
+    Downloads files in parallel and stores the hashes of the successfully downloaded files in the manifest.
+    Files that could not be downloaded are kept in the manifest as failed.
+
+    :param y: Object used to download files (e.g., Yandex Disk API)
+    :param files_to_download: List of dictionaries with information about files on disk
+    :param load_path: Path to the local directory for downloading files
+    :param manifest: Dictionary with the manifest
+    :param max_workers: Maximum number of simultaneous downloads
+    :return: List of dictionaries with download statistics for each downloaded file
+    """
+    results = download_files_concurrently(y, files_to_download, load_path, max_workers=max_workers)
+    downloaded = {result['file'] for result in results}
+    for file_info in files_to_download:
+        if os.path.basename(file_info['path']) in downloaded:
+            record_files_in_manifest(manifest, [file_info])
+        else:
+            record_failed_file(manifest, file_info)
+    return results
+
+
+# Define a function to compress a file into the content-addressed archive
+def archive_file(local_file_path, archive_path, sha256=None):
+    """
+    Moves a file into the archive as a compressed blob named by the sha256 hash of its contents
+    and adds the version to the archive index. Identical versions are stored only once.
+    The hash is always calculated from the local file, so a blob name never refers to other contents
+    (e.g., when the local copy differs from the version recorded in the manifest).
+
+    :param local_file_path: Path to the file to be archived
+    :param archive_path: Path to the archive directory
+    :param sha256: sha256 hash recorded for the file (e.g., in the manifest); a mismatch is reported
+    :return: Path to the compressed blob
+    """
+    file_name = os.path.basename(local_file_path)
+    recorded_sha256 = sha256
+    sha256 = calculate_file_hash(local_file_path, 'sha256')
+    if recorded_sha256 and recorded_sha256 != sha256:
+        print(f"Warning: file '{file_name}' does not match the hash recorded in the manifest; "
+              f"it is archived by the hash of its contents.")
+    extension = '.zst' if zstandard is not None else '.gz'
+    blobs_path = os.path.join(archive_path, 'blobs')
+    os.makedirs(blobs_path, exist_ok=True)
+    blob_path = os.path.join(blobs_path, sha256 + extension)
+
+    # Compress the file only if this version has not been archived before
+    if not os.path.exists(blob_path):
+        with open(local_file_path, 'rb') as source, open(blob_path + '.tmp', 'wb') as target:
+            if zstandard is not None:
+                zstandard.ZstdCompressor(level=10, threads=-1).copy_stream(source, target)
+            else:
+                with gzip.GzipFile(fileobj=target, mode='wb', compresslevel=6) as compressed:
+                    shutil.copyfileobj(source, compressed, 2**20)
+        os.replace(blob_path + '.tmp', blob_path)
+
+    version = {
+        'sha256': sha256,
+        'blob': os.path.basename(blob_path),
+        'size': os.path.getsize(local_file_path),
+        'compressed_size': os.path.getsize(blob_path),
+        'archived_at': datetime.now(timezone.utc).isoformat()
+    }
+    with archive_lock:
+        index = load_archive_index(archive_path)
+        versions = index.setdefault(file_name, [])
+        versions[:] = [v for v in versions if v['sha256'] != sha256]
+        versions.append(version)
+        save_archive_index(archive_path, index)
+
+    os.remove(local_file_path)
+    print(f"File '{file_name}' has been archived: {version['size'] / 2**20:.2f} MB -> "
+          f"{version['compressed_size'] / 2**20:.2f} MB")
+    return blob_path
+
+
+# Define a function to read the archive index
+def load_archive_index(archive_path):
+    """
+    Reads the archive index: file name -> list of archived versions, oldest first.
+
+    :param archive_path: Path to the archive directory
+    :return: Dictionary with the archive index
+    """
+    index_path = os.path.join(archive_path, 'index.json')
+    if not os.path.exists(index_path):
+        return {}
+
+    with open(index_path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+# Define a function to save the archive index
+def save_archive_index(archive_path, index):
+    """
+    Saves the archive index, replacing the previous version atomically.
+
+    :param archive_path: Path to the archive directory
+    :param index: Dictionary with the archive index
+    """
+    index_path = os.path.join(archive_path, 'index.json')
+    with open(index_path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(index, file, ensure_ascii=False, indent=2)
+    os.replace(index_path + '.tmp', index_path)
+
+
+# Define a function to restore a file from the archive
+def restore_archived_file(archive_path, file_name, dest_path, sha256=None):
+    """
+    Decompresses an archived version of a file, e.g. to roll back to an earlier export.
+    Blobs compressed with zstd can be restored only if the zstandard package is installed.
+
+    :param archive_path: Path to the archive directory
+    :param file_name: Name of the archived file
+    :param dest_path: Path where the restored file is written
+    :param sha256: Hash of the version to restore; the latest archived version if None
+    :return: Path to the restored file
+    :raises ImportError: If the version is compressed with zstd and zstandard is not installed
+    """
+    versions = load_archive_index(archive_path).get(file_name, [])
+    if sha256 is not None:
+        versions = [v for v in versions if v['sha256'] == sha256]
+    if not versions:
+        raise FileNotFoundError(f"No archived version of '{file_name}' found")
+
+    blob_path = os.path.join(archive_path, 'blobs', versions[-1]['blob'])
+    if blob_path.endswith('.zst') and zstandard is None:
+        raise ImportError(f"Archived version of '{file_name}' is compressed with zstd; "
+                          f"install the zstandard package to restore it")
+
+    with open(blob_path, 'rb') as source, open(dest_path + '.tmp', 'wb') as target:
+        if blob_path.endswith('.zst'):
+            zstandard.ZstdDecompressor().copy_stream(source, target)
+        else:
+            with gzip.GzipFile(fileobj=source, mode='rb') as compressed:
+                shutil.copyfileobj(compressed, target, 2**20)
+    os.replace(dest_path + '.tmp', dest_path)
+    return dest_path
+
+
+# Define a function to remove old versions from the archive
+def evict_archive(archive_path, max_age_days=None, max_total_bytes=None):
+    """
+    Removes archived versions older than max_age_days, then the oldest remaining versions until
+    the archive fits into max_total_bytes, and deletes blobs that are no longer referenced.
+
+    :param archive_path: Path to the archive directory
+    :param max_age_days: Maximum age of archived versions in days; no age limit if None
+    :param max_total_bytes: Maximum total size of compressed blobs; no size limit if None
+    :return: List of deleted blob names
+    """
+    with archive_lock:
+        index = load_archive_index(archive_path)
+        versions = [(file_name, version) for file_name, file_versions in index.items() for version in file_versions]
+        versions.sort(key=lambda item: item[1]['archived_at'])
+
+        # Drop versions by age
+        if max_age_days is not None:
+            threshold = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).isoformat()
+            versions = [item for item in versions if item[1]['archived_at'] >= threshold]
+
+        # Drop the oldest versions until the archive fits into the size limit
+        if max_total_bytes is not None:
+            blob_sizes = {version['blob']: version['compressed_size'] for _, version in versions}
+            while versions and sum(blob_sizes.values()) > max_total_bytes:
+                versions.pop(0)
+                blob_sizes = {version['blob']: version['compressed_size'] for _, version in versions}
+
+        new_index = {}
+        for file_name, version in versions:
+            new_index.setdefault(file_name, []).append(version)
+        save_archive_index(archive_path, new_index)
+
+        # Delete blobs that are not referenced by any remaining version
+        referenced = {version['blob'] for _, version in versions}
+        blobs_path = os.path.join(archive_path, 'blobs')
+        deleted = [blob for blob in (os.listdir(blobs_path) if os.path.exists(blobs_path) else [])
+                   if blob not in referenced]
+        for blob in deleted:
+            os.remove(os.path.join(blobs_path, blob))
+
+    if deleted:
+        print(f'Removed {len(deleted)} blobs from the archive.')
+    return deleted
+
+
+# Define a function to collect information about a file on disk
+def make_file_info(el):
+    """
+    Collects the path, upload date (last modified), size and hashes of a file on disk.
+
+    :param el: Resource object returned by the disk listing
+    :return: Dictionary with information about the file
+    """
+    return {
+        'path': el['path'],
+        'upload_date': el['modified'],  # Get the last modified date
+        'size': el['size'],
+        'md5': el['md5'],
+        'sha256': el['sha256']
+    }
+
+
+# Define a generator to list files on disk page by page
+def iter_disk_files(y, path='aif_etl', page_size=100, recursive=False, modified_since=None,
+                    extensions=SUPPORTED_EXTENSIONS):
+    """
+    Lazily yields information about files in a folder on disk, requesting the listing page by page.
+    The disk returns the newest files first, so when modified_since is given the listing stops
+    at the first older file instead of scanning the whole folder.
+
+    :param y: Object used to get the list of files (e.g., Yandex Disk API)
+    :param path: Path to the folder on disk
+    :param page_size: Number of files requested per page
+    :param recursive: Whether to descend into subfolders
+    :param modified_since: Yield only files modified after this datetime; all files if None
+    :param extensions: File extensions to yield
+    :return: Generator of dictionaries with information about files
+    """
+    for el in y.listdir(path, limit=page_size, sort='-modified'):
+        if el['type'] == 'dir':
+            if recursive:
+                yield from iter_disk_files(y, el['path'], page_size, recursive, modified_since, extensions)
+            continue
+
+        if modified_since is not None and el['modified'] <= modified_since:
+            # The rest of the folder is older; only subfolders can still hold newer files
+            if not recursive:
+                return
+            continue
+
+        if el['path'].endswith(extensions):
+            yield make_file_info(el)
+
+
+# Define a function to get the start time of the last successful run
+def get_last_successful_run(load_path):
+    """
+    Returns the start time of the last run that loaded the data into the database.
+
+    :param load_path: Path to the local directory with downloaded files
+    :return: Datetime of the last successful run, or None if there was none
+    """
+    last_run = load_manifest(load_path).get('last_successful_run')
+    return datetime.fromisoformat(last_run) if last_run else None
+
+
+# Define a function to record a successful run
+def mark_successful_run(load_path, started_at):
+    """
+    Stores the start time of a run that loaded the data into the database, so the next run
+    lists only files modified after it. The run is not marked successful while some listed files
+    could not be downloaded, otherwise the next run would not list them again.
+
+    :param load_path: Path to the local directory with downloaded files
+    :param started_at: Datetime (with timezone) when the run started
+    :return: True if the run was marked successful, False otherwise
+    """
+    manifest = load_manifest(load_path)
+    failed_files = manifest.get('failed_files')
+    if failed_files:
+        print(f"The run is not marked successful: {len(failed_files)} files were not downloaded "
+              f"({', '.join(sorted(failed_files))}). They will be downloaded again by the next run.")
+        return False
+
+    manifest['last_successful_run'] = started_at.isoformat()
+    save_manifest(load_path, manifest)
+    return True
+
+
 # Define a function to create lists of files on disk and in the local folder
-def create_file_list_and_load_path(y):
+def create_file_list_and_load_path(y, max_workers=4, page_size=100, recursive=False, since_last_run=False):
     """
     Creates a list of files for download from the specified path and outputs information about files in the local folder.
 
     :param y: Object used to get the list of files (e.g., Yandex Disk API)
+    :param max_workers: Maximum number of simultaneous downloads
+    :param page_size: Number of files requested per page of the listing
+    :param recursive: Whether to include files from subfolders
+    :param since_last_run: List only files modified since the last successful run
     :return: list_of_files, load_path, files_with_dates
     """
-
-    print('Creating list of files')
-    list_of_files = []
-    for el in tqdm(y.listdir('aif_etl')):
-        if el['path'].endswith(('.csv', '.pkl', 'txt')):
-            # Add the path and upload date (last modified) of the file
-            file_info = {
-                'path': el['path'],
-                'upload_date': el['modified']  # Get the last modified date
-            }
-            list_of_files.append(file_info)
-
-    # Check the contents of the file list
-    print('Files from disk:')
-    for file in list_of_files:
-        print(f"File: {file['path']}, Date: {file['upload_date']}")
-    print()
-    
     # Create a folder for loading data
     current_directory = os.getcwd()
     load_path = os.path.join(current_directory, 'aif_etl')
@@ -169,26 +1353,33 @@ def create_file_list_and_load_path(y):
         os.mkdir(load_path) 
 
     os.chdir(load_path)
-    
-    # Get the list of files in the local folder
-    local_files = os.listdir(load_path)
 
+    modified_since = get_last_successful_run(load_path) if since_last_run else None
+    if modified_since is not None:
+        print(f'Listing files modified since {modified_since}')
+
+    print('Creating list of files')
+    list_of_files = list(tqdm(iter_disk_files(y, 'aif_etl', page_size=page_size, recursive=recursive,
+                                              modified_since=modified_since)))
+
+    # Check the contents of the file list
+    print('Files from disk:')
+    for file in list_of_files:
+        print(f"File: {file['path']}, Date: {file['upload_date']}")
+    print()
+    
     # Check if files need to be downloaded (if they exist in the folder or not)
-    if len(local_files) < len(list_of_files):
+    missing_files = [file_info for file_info in list_of_files
+                     if not os.path.exists(os.path.join(load_path, os.path.basename(file_info['path'])))]
+
+    # Download only the missing files and remember their hashes
+    if missing_files:
         print("Local directory is missing some files. Downloading...")
-        for file_info in list_of_files:
-            file_name = os.path.basename(file_info['path'])
-            local_file_path = os.path.join(load_path, file_name)
-            
-            # Download only the missing files
-            if not os.path.exists(local_file_path):
-                try:
-                    y.download(file_info['path'], local_file_path)
-                    print(f"Downloaded '{file_name}'")
-                except Exception as e:
-                    print(f"Error downloading file '{file_name}': {e}")
+        manifest = load_manifest(load_path)
+        download_and_record_files(y, missing_files, load_path, manifest, max_workers=max_workers)
+        save_manifest(load_path, manifest)
 
-    # Update the list of local files after downloading
+    # Get the list of files in the local folder after downloading
     local_files = os.listdir(load_path)
 
     # Create a list to store files and their upload dates
@@ -207,13 +1398,17 @@ def create_file_list_and_load_path(y):
 
 
 # Define a function to check for new files and update old ones
-def check_and_update_files(list_of_files, load_path):
+def check_and_update_files(y, list_of_files, load_path, max_workers=4):
     """
-    Checks and updates files in the local directory, moving old versions to an archive
-    and downloading new versions from disk.
+    Checks and updates files in the local directory, compressing old versions into the archive
+    and downloading new versions from disk. A file is considered changed when the hash reported
+    by the disk differs from the hash stored in the manifest, so unchanged files are neither
+    downloaded nor archived.
 
+    :param y: Object used to download files (e.g., Yandex Disk API)
     :param list_of_files: List of files to check and update
     :param load_path: Path to the local directory for downloading files
+    :param max_workers: Maximum number of simultaneous downloads
     """
     # Path to the local directory and archive
     archive_path = os.path.join(load_path, 'archive')
@@ -221,129 +1416,1739 @@ def check_and_update_files(list_of_files, load_path):
     # Create the archive subdirectory if it does not exist
     os.makedirs(archive_path, exist_ok=True)
 
-    # Get the list of files in the local folder
+    # Get the list of files in the local folder and the manifest of their hashes
     local_files = os.listdir(load_path)
+    manifest = load_manifest(load_path)
 
-    new_files = []  
+    new_files = []
+    updated_files = []
 
     # Check and update files
     for file_info in tqdm(list_of_files):
         file_name = os.path.basename(file_info['path'])
 
-        # Check for the 'upload_date' key
-        if 'upload_date' in file_info:
-            upload_date = file_info['upload_date']
-
-            # Check the type of upload_date
-            if isinstance(upload_date, str):
-                # Convert the string to a datetime object
-                upload_date = datetime.strptime(upload_date, '%Y-%m-%d')
-            elif not isinstance(upload_date, datetime):
-                print(f"Upload date for file '{file_name}' is of an unexpected type: {type(upload_date)}. Skipping...")
-                continue  # Skip this file if the type is unexpected
-        else:
-            print(f"Upload date not found for file '{file_name}'. Skipping...")
-            continue  # Skip this file if there is no date
-
-        # If upload_date has a timezone, use that
-        if upload_date.tzinfo is None:
-            upload_date = upload_date.replace(tzinfo=timezone.utc)
-
-        local_file_path = os.path.join(load_path, file_name)
-        local_mod_time = datetime.fromtimestamp(os.path.getmtime(local_file_path), tz=timezone.utc)
+        # Add the file to the list of new ones if it is not in the local files
+        if file_name not in local_files:
+            new_files.append(file_info)
+            continue
 
-        if upload_date > local_mod_time:
-            # If the file on disk is newer, move the old file to the archive
-            shutil.move(local_file_path, os.path.join(archive_path, file_name))
-            print(f"File '{file_name}' has been updated.")
-            try:
-                download_path = file_info['path']  # Path to the file on disk
-                new_file_path = os.path.join(load_path, file_name)
-                # Download the file from disk
-                y.download(download_path, new_file_path)  
-                print(f"File '{file_name}' has been downloaded.")
-            except Exception as e:
-                print(f"Error downloading file '{file_name}': {e}")
-        else:
+        if is_file_unchanged(file_info, manifest, load_path):
             print(f"File '{file_name}' does not require updating.")
+        else:
+            # If the file on disk has changed, move the old file to the archive
+            local_file_path = os.path.join(load_path, file_name)
+            entry = manifest['files'].get(file_name) or {}
+            archive_file(local_file_path, archive_path, sha256=entry.get('sha256'))
+            print(f"File '{file_name}' has been updated.")
+            updated_files.append(file_info)
 
-        # Add the file to the list of new ones if it is not in the local files
-        if file_name not in local_files:
-            new_files.append(file_name)
-
-    # Output the list of new files
-    if new_files:
-        print("Downloading new files:")
-        for file in tqdm(new_files):
-            # Downloading the file
-            y.download(file_info['path'], file)  
-            print(f'File {file} uploaded.')
-    else:
+    if not new_files:
         print('There are no new files.')
 
+    # Download updated and new files from disk in one pool, so the total time is about that of the slowest file
+    if updated_files or new_files:
+        print(f"Downloading {len(updated_files)} updated and {len(new_files)} new files:")
+        download_and_record_files(y, updated_files + new_files, load_path, manifest, max_workers=max_workers)
+
+    # Save the hashes of the checked and downloaded files
+    save_manifest(load_path, manifest)
+
         
-# Define a function for reading files
-def read_and_sort_files(load_path):
+# Define a function to determine the dataset of an exported file
+def classify_file(file_path):
     """
-    Reads CSV files from the specified directory, sorts them, and categorizes them
-    into 'dobro' and 'other' based on the presence of the keyword 'dobro' in the filename.
+    Determines the dataset of an exported file by the column signature of its header: a file belongs
+    to a dataset when its header contains at least half of the columns declared in the schema registry.
+    Only the header (or the schema of a binary file) is read. Pickle files, whose columns are unknown
+    without loading them, and files that are not available locally (e.g., being streamed)
+    are classified by name ('dobro' - customers, 'Заказы' - orders).
+
+    :param file_path: Path to the file
+    :return: 'customers', 'orders' or 'other'
+    """
+    header = read_file_columns(file_path) if os.path.exists(file_path) else None
+    if header is not None:
+        header = set(header)
+        for dataset, schema in [('customers', CUSTOMERS_SCHEMA), ('orders', ORDERS_SCHEMA)]:
+            if len(header & schema.keys()) >= len(schema) / 2:
+                return dataset
+        return 'other'
+
+    file_name = os.path.basename(file_path).lower()
+    if 'dobro' in file_name:
+        return 'customers'
+    if 'заказы' in file_name:
+        return 'orders'
+    return 'other'
+
+
+# Define a function to choose the schema of an exported file
+def schema_for_file(file_path):
+    """
+    Returns the schema registry entry for an exported file based on its dataset.
 
-    Args:
-        load_path (str): The path to the directory containing the files to be read.
+    :param file_path: Path to the file
+    :return: CUSTOMERS_SCHEMA, ORDERS_SCHEMA or None for other files
+    """
+    return {'customers': CUSTOMERS_SCHEMA, 'orders': ORDERS_SCHEMA}.get(classify_file(file_path))
 
-    Returns:
-        tuple: Four lists containing:
-            - dobro_files (list): Filenames that contain 'dobro'.
-            - other_files (list): Filenames that do not contain 'dobro'.
-            - dobro_dataframes (list): DataFrames corresponding to 'dobro' files.
-            - other_dataframes (list): DataFrames corresponding to 'other' files.
+
+# Define a function to choose the columns read from an exported file
+def column_spec_for_file(file_path):
     """
-    # Get the list of files in the local folder
-    local_files = os.listdir(load_path)
-    local_files.sort()  # Sort files in alphabetical order
+    Returns the keep/drop column specification for an exported file based on its dataset.
 
-    # Counters for file namesв
-    file_count_dobro = 1
-    file_count_other = 1
+    :param file_path: Path to the file
+    :return: Tuple (columns to keep or None for all, columns to drop)
+    """
+    dataset = classify_file(file_path)
+    if dataset == 'customers':
+        return CUSTOMERS_COLUMNS_TO_KEEP, CUSTOMERS_COLUMNS_TO_DROP
+    if dataset == 'orders':
+        return ORDERS_COLUMNS_TO_KEEP, ORDERS_COLUMNS_TO_DROP
+    return None, []
 
-    # Lists to store files and dataframes
-    dobro_files = []
-    other_files = []
-    dobro_dataframes = []  # List for 'dobro dataframes
-    other_dataframes = []  # List for 'other' dataframes
 
-    # Read files and create dataframes
-    for file in local_files:
-        if file.endswith('.csv'):  # Read only CSV files
-            try:
-                file_path = os.path.join(load_path, file)
-                df = pd.read_csv(file_path, sep=';')
-
-                if "dobro" in file.lower():  # If the file contains 'dobro' in any case
-                    dobro_files.append(file)  # Add file to the 'dobro' list
-                    dobro_dataframes.append(df)  # Add dataframe to the list
-                    print(f"File '{file}' has been read as 'file_{file_count_dobro}'.")
-                    file_count_dobro += 1  # Increment the counter
-                else:
-                    other_files.append(file)  # Add file to the 'other' list
-                    other_dataframes.append(df)  # Add dataframe to the list
-                    print(f"File '{file}' has been read as 'other_file_{file_count_other}'.")
-                    file_count_other += 1  # Increment the counter
+# Define a function to select the columns to be read
+def select_columns(header, columns_to_keep=None, columns_to_drop=()):
+    """
+    Applies a keep/drop column specification to the header of a file.
 
+    :param header: List of columns in the file
+    :param columns_to_keep: Columns to be read; all columns if None
+    :param columns_to_drop: Columns not to be read
+    :return: List of columns to be read, in the order of the header
+    """
+    return [col for col in header
+            if (columns_to_keep is None or col in columns_to_keep) and col not in columns_to_drop]
+
+
+# Define a function to read the headers of several files
+def read_dataset_header(load_path, files):
+    """
+    Reads the headers of the files of a dataset, e.g. to report removed columns without reading the data.
+
+    :param load_path: Path to the directory containing the files
+    :param files: Names of the files
+    :return: List of columns of all files, in the order of their first appearance
+    """
+    header = {}
+    for file in files:
+        header.update(dict.fromkeys(read_file_columns(os.path.join(load_path, file)) or []))
+    return list(header)
+
+
+# Define a function to determine the delimiter of a delimited text file
+def detect_delimiter(file_path):
+    """
+    Returns the delimiter of a delimited file: ';' for CSV exports, and the most frequent
+    of ';', tab, ',' and '|' in the first row for '.txt' files.
+
+    :param file_path: Path to the file
+    :return: Delimiter character
+    """
+    if not file_path.endswith('.txt'):
+        return ';'
+
+    with open(file_path, encoding='utf-8-sig') as file:
+        first_row = file.readline()
+    return max([';', '\t', ',', '|'], key=first_row.count)
+
+
+# Define a function to read the header of a CSV file
+def read_csv_header(file_path, delimiter=';'):
+    """
+    Reads only the first row of a CSV file.
+
+    :param file_path: Path to the file
+    :param delimiter: Delimiter of the file
+    :return: List of column names
+    """
+    with open(file_path, encoding='utf-8-sig') as file:
+        return file.readline().rstrip('\r\n').split(delimiter)
+
+
+# Define a function to get the columns of an exported file without reading its data
+def read_file_columns(file_path):
+    """
+    Returns the column names of an exported file: the header of delimited files and the schema
+    of Parquet and Feather files. The columns of pickle files are not known without loading them.
+
+    :param file_path: Path to the file
+    :return: List of column names, or None for pickle files
+    """
+    if file_path.endswith('.parquet'):
+        return pyarrow.parquet.read_schema(file_path).names
+    if file_path.endswith('.feather'):
+        return pa.ipc.open_file(pa.memory_map(file_path, 'r')).schema.names
+    if file_path.endswith('.pkl'):
+        return None
+    return read_csv_header(file_path, detect_delimiter(file_path))
+
+
+# Define a function to report the differences between the columns of a file and its schema
+def report_schema_differences(columns, schema, file_name):
+    """
+    Prints the columns that are not in the schema and the schema columns that are missing in the file.
+
+    :param columns: Columns of the file
+    :param schema: Schema registry entry
+    :param file_name: Name of the file
+    """
+    unknown_columns = [col for col in columns if col not in schema]
+    missing_columns = [col for col in schema if col not in columns]
+    if unknown_columns:
+        print(f"File '{file_name}': unknown columns read as strings: {unknown_columns}")
+    if missing_columns:
+        print(f"File '{file_name}': columns from the schema are missing: {missing_columns}")
+
+
+# Define a function to report missing values in non-nullable columns
+def check_nullability(table, schema, file_name):
+    """
+    Prints the columns declared as non-nullable in the schema that have missing values.
+
+    :param table: pyarrow.Table
+    :param schema: Schema registry entry
+    :param file_name: Name of the file
+    """
+    for col, spec in schema.items():
+        if not spec['nullable'] and col in table.column_names and table.column(col).null_count:
+            print(f"File '{file_name}': column '{col}' is declared non-nullable but has missing values.")
+
+
+# Define a function to bring a table read from a binary file to the types of the schema registry
+def conform_table_to_schema(table, schema, file_name):
+    """
+    Casts the columns of a table read from a binary file (Parquet, Feather, pickle) to the types
+    declared in the schema; columns that are not in the schema are reported and cast to strings.
+
+    :param table: pyarrow.Table
+    :param schema: Schema registry entry, or None for files without a schema
+    :param file_name: Name of the file
+    :return: pyarrow.Table with the declared types
+    """
+    if schema is None:
+        return table
+
+    report_schema_differences(table.column_names, schema, file_name)
+    for i, col in enumerate(table.column_names):
+        target_type = ARROW_TYPES[schema[col]['type']] if col in schema else pa.string()
+        if table.schema.field(i).type != target_type:
+            table = table.set_column(i, col, pc.cast(table.column(i), target_type))
+    check_nullability(table, schema, file_name)
+    return table
+
+
+# Define a function to enable reading pickle files
+def allow_pickle_files(allow=True):
+    """
+    Enables or disables reading pickle files. Loading a pickle file can run arbitrary code,
+    so it should be enabled only when the exports on the disk are trusted. The setting is passed
+    to the worker processes that parse files.
+
+    :param allow: Whether pickle files are read
+    """
+    global READ_PICKLE_FILES
+    READ_PICKLE_FILES = allow
+
+
+# Define a function to read an exported file of any supported format into an Arrow table
+def read_export_table(file_path):
+    """
+    Reads an exported file (CSV, delimited '.txt', pickle, Parquet or Feather) into an Arrow table.
+    Every format goes through the same classification, keep/drop column specification and schema checks.
+    Pickle files are read only if allowed (see allow_pickle_files).
+
+    :param file_path: Path to the file
+    :return: pyarrow.Table with the file contents
+    :raises ValueError: If the file is a pickle file and reading pickle files is not allowed
+    """
+    file_name = os.path.basename(file_path)
+    schema = schema_for_file(file_path)
+    columns_to_keep, columns_to_drop = column_spec_for_file(file_path)
+
+    if file_path.endswith(('.csv', '.txt')):
+        return read_csv_table(file_path, schema, columns_to_keep, columns_to_drop, detect_delimiter(file_path))
+
+    if file_path.endswith('.pkl'):
+        if not READ_PICKLE_FILES:
+            raise ValueError(f"File '{file_name}' is a pickle file, which can run arbitrary code when loaded; "
+                             f"call allow_pickle_files() to read trusted pickle files")
+        df = pd.read_pickle(file_path)
+        df = df[select_columns(list(df.columns), columns_to_keep, columns_to_drop)]
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    else:
+        columns = select_columns(read_file_columns(file_path), columns_to_keep, columns_to_drop)
+        if file_path.endswith('.parquet'):
+            table = pyarrow.parquet.read_table(file_path, columns=columns, memory_map=True)
+        else:
+            table = pyarrow.feather.read_table(file_path, columns=columns, memory_map=True)
+
+    return conform_table_to_schema(table, schema, file_name)
+
+
+# Define a function to read a CSV file into an Arrow table with the types declared in the schema registry
+def read_csv_table(file_path, schema=None, columns_to_keep=None, columns_to_drop=(), delimiter=';'):
+    """
+    Reads a CSV file with the multithreaded PyArrow CSV engine, assigning the data types and
+    timestamp formats declared in the schema at parse time. Columns that are not in the schema
+    are reported and read as strings instead of being inferred. Only the columns selected by the
+    keep/drop specification are converted; the others are never allocated.
+
+    :param file_path: Path to the file
+    :param schema: Schema registry entry (column -> type, format, nullability); types are inferred if None
+    :param columns_to_keep: Columns to be read; all columns if None
+    :param columns_to_drop: Columns not to be read
+    :param delimiter: Delimiter of the file
+    :return: pyarrow.Table with the file contents
+    """
+    file_name = os.path.basename(file_path)
+    read_options = pyarrow.csv.ReadOptions(use_threads=True)
+    parse_options = pyarrow.csv.ParseOptions(delimiter=delimiter)
+    header = read_csv_header(file_path, delimiter)
+    include_columns = select_columns(header, columns_to_keep, columns_to_drop)
+
+    if schema is None:
+        return pyarrow.csv.read_csv(file_path, read_options=read_options, parse_options=parse_options,
+                                    convert_options=csv_convert_options(include_columns))
+
+    # Report columns that differ from the schema
+    report_schema_differences(header, schema, file_name)
+
+    column_types = {col: ARROW_TYPES[schema[col]['type']] if col in schema else pa.string()
+                    for col in include_columns}
+
+    def read(column_types):
+        convert_options = csv_convert_options(include_columns, schema, column_types)
+        return pyarrow.csv.read_csv(file_path, read_options=read_options, parse_options=parse_options,
+                                    convert_options=convert_options)
+
+    try:
+        table = read(column_types)
+    except pa.ArrowInvalid as e:
+        # Typed columns are read as strings and cast after reading; values that do not match the declared
+        # type (e.g., a timestamp in another format or text in a numeric column) go through cast_series,
+        # so a single bad value becomes a missing value instead of failing the whole file
+        print(f"File '{file_name}': {e}. Typed columns are converted after reading.")
+        typed_columns = [col for col, col_type in column_types.items() if col_type != pa.string()]
+        table = read({**column_types, **dict.fromkeys(typed_columns, pa.string())})
+        for col in typed_columns:
+            i = table.schema.get_field_index(col)
+            try:
+                column = pc.cast(table.column(i), column_types[col])
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                values = table.column(i).to_pandas().rename(f'{file_name}: {col}')
+                column = pa.array(cast_series(values, schema[col]['type']), type=column_types[col], from_pandas=True)
+            table = table.set_column(i, col, column)
+
+    # Report missing values in columns declared as non-nullable
+    check_nullability(table, schema, file_name)
+
+    return table
+
+
+# Define a function to build the CSV conversion options for the types declared in the schema registry
+def csv_convert_options(include_columns, schema=None, column_types=None):
+    """
+    Builds the PyArrow CSV conversion options that read the selected columns with the data types and
+    timestamp formats declared in the schema; columns that are not in the schema are read as strings.
+
+    :param include_columns: Columns to be read
+    :param schema: Schema registry entry; types are inferred if None
+    :param column_types: Column -> Arrow type overriding the types derived from the schema
+    :return: pyarrow.csv.ConvertOptions
+    """
+    if schema is None:
+        return pyarrow.csv.ConvertOptions(include_columns=include_columns)
+
+    if column_types is None:
+        column_types = {col: ARROW_TYPES[schema[col]['type']] if col in schema else pa.string()
+                        for col in include_columns}
+    # The formats are de-duplicated by equality, as pyarrow.csv.ISO8601 cannot be hashed
+    timestamp_formats = []
+    for spec in schema.values():
+        if spec.get('format') is not None and spec['format'] not in timestamp_formats:
+            timestamp_formats.append(spec['format'])
+    return pyarrow.csv.ConvertOptions(column_types=column_types, timestamp_parsers=timestamp_formats,
+                                      include_columns=include_columns, strings_can_be_null=True)
+
+
+# Define a function to read a CSV file with the types declared in the schema registry
+def read_csv_with_schema(file_path, schema, columns_to_keep=None, columns_to_drop=()):
+    """
+    Reads a CSV file into a DataFrame with the data types declared in the schema (see read_csv_table).
+
+    :param file_path: Path to the file
+    :param schema: Schema registry entry (column -> type, format, nullability)
+    :param columns_to_keep: Columns to be read; all columns if None
+    :param columns_to_drop: Columns not to be read
+    :return: DataFrame with the file contents
+    """
+    return read_csv_table(file_path, schema, columns_to_keep, columns_to_drop).to_pandas()
+
+
+# Define a function to parse a file into an Arrow IPC file (runs in a worker process)
+def parse_file_to_ipc(file_path, ipc_path):
+    """
+    Parses an exported file and writes the result as an uncompressed Arrow IPC (Feather) file,
+    which is then memory-mapped instead of passing a pickled DataFrame between processes.
+
+    :param file_path: Path to the file
+    :param ipc_path: Path to the Arrow IPC file
+    :return: Path to the Arrow IPC file
+    """
+    table = read_export_table(file_path)
+
+    # Write to a temporary file first, so an interrupted write never looks like a complete one
+    with pa.OSFile(ipc_path + '.tmp', 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(ipc_path + '.tmp', ipc_path)
+    return ipc_path
+
+
+# Define a function to read a memory-mapped Arrow IPC file
+def read_ipc_file(ipc_path):
+    """
+    Opens an Arrow IPC file as a memory-mapped table without copying its data.
+
+    :param ipc_path: Path to the Arrow IPC file
+    :return: pyarrow.Table backed by the memory-mapped file
+    """
+    return pa.ipc.open_file(pa.memory_map(ipc_path, 'r')).read_all()
+
+
+# Define a function to get the version of a schema
+def schema_version(file_path):
+    """
+    Returns a short hash of the schema registry entry and the column specification of a file,
+    so parsed data is re-created when either of them changes.
+
+    :param file_path: Path to the file
+    :return: Version string of the schema
+    """
+    spec = {'schema': schema_for_file(file_path), 'columns': column_spec_for_file(file_path)}
+    return hashlib.md5(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+# Define a function to get the name of a cached parsed file
+def cache_file_name(load_path, file, manifest):
+    """
+    Builds the name of the parsed-data cache entry from the content hash of the source file
+    (taken from the manifest when available) and the version of its schema.
+
+    :param load_path: Path to the directory containing the file
+    :param file: Name of the file
+    :param manifest: Dictionary with the manifest
+    :return: Name of the cache entry
+    """
+    file_path = os.path.join(load_path, file)
+    entry = manifest['files'].get(file) or {}
+    file_hash = entry.get('sha256') or entry.get('md5') or calculate_file_hash(file_path)
+    return f'{file_hash}-{schema_version(file_path)}.arrow'
+
+
+# Define a function to remove outdated entries from the parsed-data cache
+def evict_cache(cache_path, keep, max_bytes=None):
+    """
+    Removes cache entries whose source file has changed, then the least recently used entries
+    until the cache fits into max_bytes.
+
+    :param cache_path: Path to the cache directory
+    :param keep: Names of the cache entries of the current files
+    :param max_bytes: Maximum total size of the cache; no size limit if None
+    :return: List of removed cache entries
+    """
+    removed = [entry for entry in os.listdir(cache_path) if entry not in keep]
+    for entry in removed:
+        os.remove(os.path.join(cache_path, entry))
+
+    if max_bytes is not None:
+        entries = sorted(os.listdir(cache_path), key=lambda entry: os.path.getmtime(os.path.join(cache_path, entry)))
+        total_bytes = sum(os.path.getsize(os.path.join(cache_path, entry)) for entry in entries)
+        while entries and total_bytes > max_bytes:
+            entry = entries.pop(0)
+            total_bytes -= os.path.getsize(os.path.join(cache_path, entry))
+            os.remove(os.path.join(cache_path, entry))
+            removed.append(entry)
+
+    if removed:
+        print(f'Removed {len(removed)} entries from the parsed-data cache.')
+    return removed
+
+
+# Define a function to read several files as Arrow tables
+def read_files_as_tables(load_path, files, max_workers=None, use_cache=False, cache_max_bytes=None):
+    """
+    Parses files into memory-mapped Arrow tables, optionally in a pool of processes.
+    Every file is written as an Arrow IPC file and memory-mapped by the parent, so no DataFrame is pickled.
+    With use_cache, the parsed files are kept in the 'cache' folder keyed by content hash and schema version,
+    and files that have not changed are loaded from it without parsing. Otherwise they are written to
+    shared memory (/dev/shm when available) and removed after reading.
+
+    :param load_path: Path to the directory containing the files
+    :param files: Names of the files to be parsed
+    :param max_workers: Number of processes; files are parsed in the main process if None
+    :param use_cache: Whether to use the parsed-data cache
+    :param cache_max_bytes: Maximum total size of the cache; no size limit if None
+    :return: List of pairs (file name, pyarrow.Table) in the order of files
+    """
+    if use_cache:
+        output_dir = os.path.join(load_path, 'cache')
+        os.makedirs(output_dir, exist_ok=True)
+        manifest = load_manifest(load_path)
+        ipc_paths = {file: os.path.join(output_dir, cache_file_name(load_path, file, manifest)) for file in files}
+    else:
+        output_dir = tempfile.mkdtemp(dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+        ipc_paths = {file: os.path.join(output_dir, file + '.arrow') for file in files}
+
+    tables = {}
+    to_parse = []
+    for file in files:
+        if use_cache and os.path.exists(ipc_paths[file]):
+            print(f"File '{file}' has been loaded from the cache.")
+            os.utime(ipc_paths[file])  # Mark the entry as recently used
+            tables[file] = read_ipc_file(ipc_paths[file])
+        else:
+            to_parse.append(file)
+
+    try:
+        if max_workers:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=allow_pickle_files,
+                                     initargs=(READ_PICKLE_FILES,)) as executor:
+                futures = {executor.submit(parse_file_to_ipc, os.path.join(load_path, file), ipc_paths[file]): file
+                           for file in to_parse}
+                for future in tqdm(as_completed(futures), total=len(futures)):
+                    file = futures[future]
+                    try:
+                        tables[file] = read_ipc_file(future.result())
+                    except Exception as e:
+                        print(f"Error reading file '{file}': {e}")
+        else:
+            for file in tqdm(to_parse):
+                try:
+                    tables[file] = read_ipc_file(parse_file_to_ipc(os.path.join(load_path, file), ipc_paths[file]))
+                except Exception as e:
+                    print(f"Error reading file '{file}': {e}")
+    finally:
+        if use_cache:
+            evict_cache(output_dir, {os.path.basename(path) for path in ipc_paths.values()}, cache_max_bytes)
+        else:
+            # The mapped tables stay valid after the files are unlinked
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    return [(file, tables[file]) for file in files if file in tables]
+
+
+# Define a class to collect Arrow data of several files into one table
+class TableAccumulator:
+    """
+    Collects Arrow tables and record batches into a single Arrow table without copying them
+    and converts the result to pandas once, releasing every Arrow column as soon as it is converted,
+    so the data is held in memory about once instead of twice.
+    """
+
+    def __init__(self):
+        self.tables = []
+        self.num_rows = 0
+
+    def append(self, data):
+        """
+        Adds a pyarrow.Table or pyarrow.RecordBatch to the accumulated data.
+        """
+        if isinstance(data, pa.RecordBatch):
+            data = pa.Table.from_batches([data])
+        self.tables.append(data)
+        self.num_rows += data.num_rows
+
+    def to_table(self):
+        """
+        Returns the accumulated data as one table; the chunks are not copied.
+        """
+        return pa.concat_tables(self.tables, promote_options='default')
+
+    def to_pandas(self, max_cardinality_ratio=None):
+        """
+        Converts the accumulated data to a DataFrame and empties the accumulator.
+        With max_cardinality_ratio, string columns with few distinct values per row become categorical.
+        """
+        table = self.to_table()
+        self.tables = []
+        if max_cardinality_ratio is not None:
+            table = dictionary_encode_table(table, max_cardinality_ratio)
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+# Define a function to hash the key of every row
+def hash_keys(df, key_columns):
+    """
+    Returns a 64-bit hash of the key of every row. Integer keys are hashed as integers without converting
+    them to text, and whole floats (integer columns with missing values, e.g. read back from the database)
+    as integers too, so a key read from a file and the same key read from the database get the same hash.
+    Other keys are hashed as text.
+
+    :param df: DataFrame
+    :param key_columns: Columns that identify a row
+    :return: numpy array of uint64 hashes
+    """
+    keys = {}
+    for col in key_columns:
+        values = df[col]
+        if pd.api.types.is_integer_dtype(values) or \
+                (pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all()):
+            keys[col] = values.astype('Int64')
+        else:
+            keys[col] = values.astype(str)
+    return pd.util.hash_pandas_object(pd.DataFrame(keys, index=df.index), index=False).to_numpy()
+
+
+# Define a function to hash the key of every row of a DataFrame or an Arrow table
+def hash_row_keys(data, key_columns):
+    """
+    Returns a 64-bit hash of the key of every row, or of the whole row when the key is missing
+    or the key columns are not in the data. For Arrow tables only the key columns (and the rows
+    without a key) are converted to pandas.
+
+    :param data: DataFrame or pyarrow.Table
+    :param key_columns: Columns that identify a row
+    :return: numpy array of uint64 hashes
+    """
+    is_table = isinstance(data, pa.Table)
+    columns = data.column_names if is_table else list(data.columns)
+    subset = [col for col in key_columns if col in columns]
+    if not subset:
+        return hash_keys(data.to_pandas() if is_table else data, columns) ^ ROW_HASH_SALT
+
+    keys = data.select(subset).to_pandas() if is_table else data[subset]
+    hashes = hash_keys(keys, subset).copy()
+    missing = keys.isna().any(axis=1).to_numpy()
+    if missing.any():
+        rows = data.filter(pa.array(missing)).to_pandas() if is_table else data[missing]
+        hashes[missing] = hash_keys(rows, columns) ^ ROW_HASH_SALT
+    return hashes
+
+
+class KeyIndex:
+    """
+    Set of 64-bit key hashes stored as sorted numpy arrays (8 bytes per key, no rows are kept).
+    New keys are added as a sorted run; runs of similar size are merged, so there are about log2(n)
+    runs and every lookup is a binary search (searchsorted) in each of them.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def contains(self, hashes):
+        """
+        Returns a mask of the hashes that are in the index.
+        """
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            found |= run[positions] == hashes
+        return found
+
+    def add(self, hashes):
+        """
+        Adds hashes to the index and returns a mask of the ones that are new, i.e. not in the index
+        and not repeated earlier in the array.
+        """
+        new = np.zeros(len(hashes), dtype=bool)
+        new[np.unique(hashes, return_index=True)[1]] = True
+        new &= ~self.contains(hashes)
+
+        if new.any():
+            self.runs.append(np.sort(hashes[new]))
+            while len(self.runs) > 1 and len(self.runs[-1]) * 2 >= len(self.runs[-2]):
+                last = self.runs.pop()
+                self.runs[-1] = np.sort(np.concatenate([self.runs[-1], last]), kind='mergesort')
+        return new
+
+    def merge(self, other):
+        """
+        Adds all hashes of another index (e.g., the keys of a file read chunk by chunk) to this index.
+        """
+        if other.runs:
+            self.add(np.concatenate(other.runs))
+
+
+# Define a function to remove rows whose key has already been seen
+def drop_seen_keys(data, key_columns, seen_keys, file_keys=None):
+    """
+    Removes rows whose key occurred in earlier files, so overlapping exports can be combined file by file
+    or chunk by chunk. Rows without a key are compared by all columns. Keys repeated within one file
+    are kept, since they are not an overlap between exports (e.g., identical actions or order lines).
+    When a file is read chunk by chunk, its keys are collected in file_keys and moved to seen_keys
+    with seen_keys.merge(file_keys) after its last chunk.
+
+    :param data: DataFrame or pyarrow.Table
+    :param key_columns: Columns that identify a row
+    :param seen_keys: KeyIndex of the keys of earlier files, updated in place if file_keys is None
+    :param file_keys: KeyIndex of the keys of the current file, updated in place; None if data is a whole file
+    :return: Tuple (data without duplicate rows, number of removed rows)
+    """
+    hashes = hash_row_keys(data, key_columns)
+    new_rows = ~seen_keys.contains(hashes)
+    (seen_keys if file_keys is None else file_keys).add(hashes)
+    duplicates = int(len(new_rows) - new_rows.sum())
+    if not duplicates:
+        return data, 0
+    return (data.filter(pa.array(new_rows)) if isinstance(data, pa.Table) else data[new_rows]), duplicates
+
+
+# Define a function to concatenate the datasets read from several files
+def concat_frames(frames, max_cardinality_ratio=None, key_columns=None, names=None, null_stats=None,
+                  release_frames=False):
+    """
+    Concatenates Arrow tables (or DataFrames) read from several files into one DataFrame.
+    Every file is de-duplicated, counted and appended to a TableAccumulator as soon as it is taken from frames,
+    without copying Arrow tables, and the data is converted to pandas once (DataFrames are converted to Arrow
+    when appended). frames may be a generator that reads the files one by one; a list of files read in advance
+    shares its buffers with the result, so with release_frames the list is emptied as the files are appended
+    and every column is released as soon as it is converted to pandas.
+    With max_cardinality_ratio, string columns with few distinct values per row become categorical.
+    With key_columns, rows repeating a key from an earlier file are removed as every file is appended,
+    and the number of removed rows is reported per file. With null_stats, missing values are counted
+    file by file (for free for Arrow tables).
+
+    :param frames: List or iterable of pyarrow.Table objects or DataFrames
+    :param max_cardinality_ratio: Maximum ratio of distinct values to rows of a categorical column;
+                                  no encoding if None
+    :param key_columns: Columns that identify a row; no de-duplication if None
+    :param names: Names of the files, used in the report
+    :param null_stats: NullStatsAccumulator updated with every file as it is appended
+    :param release_frames: Whether to empty the list of frames as they are appended
+    :return: Concatenated DataFrame
+    """
+    names = list(names) if names is not None else None
+    seen_keys = KeyIndex()
+    accumulator = TableAccumulator()
+
+    def iter_frames():
+        if release_frames:
+            while frames:
+                yield frames.pop(0)
+        else:
+            yield from frames
+
+    for i, frame in enumerate(iter_frames()):
+        name = names[i] if names is not None else f'file_{i + 1}'
+        if key_columns is not None:
+            frame, duplicates = drop_seen_keys(frame, key_columns, seen_keys)
+            if duplicates:
+                print(f"File '{name}': removed {duplicates} duplicate rows.")
+        if null_stats is not None:
+            null_stats.update(frame)
+        if isinstance(frame, pd.DataFrame):
+            frame = pa.Table.from_pandas(frame, preserve_index=False)
+        accumulator.append(frame)
+        del frame
+
+    if not accumulator.tables:
+        return pd.DataFrame()
+    return accumulator.to_pandas(max_cardinality_ratio)
+
+
+# Define a function to dictionary-encode low-cardinality string columns of an Arrow table
+def dictionary_encode_table(table, max_cardinality_ratio):
+    """
+    Dictionary-encodes string columns whose number of distinct values is at most max_cardinality_ratio
+    of the number of rows, so they are converted to pandas as categorical columns without creating
+    Python strings. The limit grows with the table, so the same ratio suits small and large exports.
+
+    :param table: pyarrow.Table
+    :param max_cardinality_ratio: Maximum ratio of distinct values to rows of an encoded column
+    :return: pyarrow.Table with encoded columns
+    """
+    max_cardinality = max_cardinality_ratio * table.num_rows
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            column = table.column(i)
+            if table.num_rows and pc.count_distinct(column).as_py() <= max_cardinality:
+                table = table.set_column(i, field.name, column.dictionary_encode())
+    return table
+
+
+# Define a function to convert low-cardinality string columns of a DataFrame to categorical
+def encode_categories(df, max_cardinality_ratio):
+    """
+    Converts string columns whose number of distinct values is at most max_cardinality_ratio
+    of the number of rows to the 'category' data type.
+
+    :param df: DataFrame, changed in place
+    :param max_cardinality_ratio: Maximum ratio of distinct values to rows of an encoded column
+    :return: List of encoded columns
+    """
+    max_cardinality = max_cardinality_ratio * len(df)
+    encoded_columns = [col for col in df.columns
+                       if (df[col].dtype == 'object' or isinstance(df[col].dtype, pd.StringDtype))
+                       and len(df) and df[col].nunique() <= max_cardinality]
+    for col in encoded_columns:
+        df[col] = df[col].astype('category')
+    return encoded_columns
+
+
+# Define a function to read a single exported file
+def read_export_file(file_path):
+    """
+    Reads an exported file (CSV, delimited '.txt', pickle, Parquet or Feather) into a DataFrame.
+    Files with a known schema are read with the declared data types; other files are read with
+    type inference. Columns removed during preprocessing are not read.
+
+    :param file_path: Path to the file
+    :return: DataFrame with the file contents
+    """
+    return read_export_table(file_path).to_pandas()
+
+
+# Define a function to split read files into 'dobro' and 'other' groups
+def sort_dataframes(read_files, load_path):
+    """
+    Categorizes read files into 'dobro' (customers exports) and 'other' based on the column
+    signature of their header (see classify_file).
+
+    Args:
+        read_files (list): Pairs of a filename and its DataFrame or Arrow table, in alphabetical order.
+        load_path (str): The path to the directory containing the files.
+
+    Returns:
+        tuple: dobro_files, other_files, dobro_dataframes, other_dataframes
+    """
+    # Counters for file names
+    file_count_dobro = 1
+    file_count_other = 1
+
+    # Lists to store files and dataframes
+    dobro_files = []
+    other_files = []
+    dobro_dataframes = []  # List for 'dobro dataframes
+    other_dataframes = []  # List for 'other' dataframes
+
+    for file, df in read_files:
+        if classify_file(os.path.join(load_path, file)) == 'customers':  # If the file is a customers export
+            dobro_files.append(file)  # Add file to the 'dobro' list
+            dobro_dataframes.append(df)  # Add dataframe to the list
+            print(f"File '{file}' has been read as 'file_{file_count_dobro}'.")
+            file_count_dobro += 1  # Increment the counter
+        else:
+            other_files.append(file)  # Add file to the 'other' list
+            other_dataframes.append(df)  # Add dataframe to the list
+            print(f"File '{file}' has been read as 'other_file_{file_count_other}'.")
+            file_count_other += 1  # Increment the counter
+
+    return dobro_files, other_files, dobro_dataframes, other_dataframes
+
+
+# Define a function for reading files
+def read_and_sort_files(load_path, max_workers=None, use_cache=False, cache_max_bytes=None):
+    """
+    Reads exported files (CSV, '.txt', pickle, Parquet, Feather) from the specified directory, sorts them,
+    and categorizes them into 'dobro' (customers exports) and 'other' based on the column signature of their header.
+
+    Args:
+        load_path (str): The path to the directory containing the files to be read.
+        max_workers (int): If set, files are parsed in this many processes.
+        use_cache (bool): Whether to load unchanged files from the parsed-data cache.
+        cache_max_bytes (int): Maximum total size of the parsed-data cache.
+        The data is returned as Arrow tables (combine them with concat_frames).
+
+    Returns:
+        tuple: Four lists containing:
+            - dobro_files (list): Filenames of customers exports.
+            - other_files (list): Filenames of other files (e.g., orders exports).
+            - dobro_dataframes (list): Arrow tables corresponding to 'dobro' files.
+            - other_dataframes (list): Arrow tables corresponding to 'other' files.
+    """
+    # Get the list of files in the local folder
+    local_files = os.listdir(load_path)
+    local_files.sort()  # Sort files in alphabetical order
+
+    # Parse files across a pool of processes and/or load them from the cache
+    if max_workers or use_cache:
+        export_files = [file for file in local_files if file.endswith(SUPPORTED_EXTENSIONS)]
+        return sort_dataframes(read_files_as_tables(load_path, export_files, max_workers, use_cache, cache_max_bytes),
+                               load_path)
+
+    # Read files and create dataframes
+    read_files = []
+    for file in local_files:
+        if file.endswith(SUPPORTED_EXTENSIONS):  # Read only exported files
+            try:
+                read_files.append((file, read_export_table(os.path.join(load_path, file))))
             except Exception as e:
                 print(f"Error reading file '{file}': {e}")
 
-    return dobro_files, other_files, dobro_dataframes, other_dataframes
+    return sort_dataframes(read_files, load_path)
+
+
+# Define a stream that copies everything read from the network to a local file
+class TeeStream(io.RawIOBase):
+    """
+    Read-only stream over an HTTP response that optionally copies every block it returns
+    to a local file, so the raw bytes are kept while they are being parsed.
+    """
+
+    def __init__(self, stream, target=None):
+        self.stream = stream
+        self.target = target
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        if self.target is not None:
+            self.target.write(data)
+        return len(data)
+
+
+# Define a generator to parse a CSV file from disk while it is being downloaded
+def stream_csv_from_disk(y, file_info, chunksize=100000, tee_path=None, engine='pandas'):
+    """
+    Streams the HTTP body of a file on disk straight into an incremental CSV parser and yields
+    parsed chunks while bytes are still arriving. The raw bytes can be copied to tee_path
+    (through a '.part' file that is checked and renamed at the end), e.g. for the archive.
+    The '.part' file is deleted if the stream is not read to the end or does not match the file on disk.
+    The pyarrow engine reads the columns with the types declared in the schema registry, as read_csv_table does.
+
+    :param y: Object used to get the download link (e.g., Yandex Disk API)
+    :param file_info: Dictionary with the path, size and hashes of the file on disk
+    :param chunksize: Number of rows per DataFrame chunk (pandas engine)
+    :param tee_path: Path where the raw file is saved; the file is not saved if None
+    :param engine: 'pandas' to yield DataFrames, 'pyarrow' to yield Arrow record batches
+    :return: Generator of DataFrames or pyarrow.RecordBatch objects
+    """
+    link = y.get_download_link(file_info['path'])
+    columns_to_keep, columns_to_drop = column_spec_for_file(file_info['path'])
+    target = open(tee_path + '.part', 'wb') if tee_path else None
+    completed = False
+
+    try:
+        with urllib.request.urlopen(link) as response:
+            stream = io.BufferedReader(TeeStream(response, target), buffer_size=2**20)
+            if engine == 'pyarrow':
+                # The header is read first, so only the selected columns are converted
+                header = stream.readline().decode('utf-8-sig').rstrip('\r\n').split(';')
+                convert_options = csv_convert_options(select_columns(header, columns_to_keep, columns_to_drop),
+                                                      schema_for_file(file_info['path']))
+                reader = pyarrow.csv.open_csv(stream, read_options=pyarrow.csv.ReadOptions(column_names=header),
+                                              parse_options=pyarrow.csv.ParseOptions(delimiter=';'),
+                                              convert_options=convert_options)
+                for batch in reader:
+                    yield batch
+            else:
+                usecols = lambda col: (columns_to_keep is None or col in columns_to_keep) and col not in columns_to_drop
+                for chunk in pd.read_csv(stream, sep=';', usecols=usecols, chunksize=chunksize):
+                    yield chunk
+            # Copy the rest of the body, if any, so the local file is complete
+            while stream.read(2**20):
+                pass
+        completed = True
+    finally:
+        if target is not None:
+            target.close()
+            if not completed:
+                os.remove(tee_path + '.part')
+
+    if tee_path:
+        try:
+            verify_downloaded_file(tee_path + '.part', file_info)
+        except ValueError:
+            os.remove(tee_path + '.part')
+            raise
+        os.replace(tee_path + '.part', tee_path)
+
+
+# Define a function to read files from disk without saving them before parsing
+def read_disk_files_streaming(y, list_of_files, load_path, keep_local_copy=True):
+    """
+    Reads CSV files while they are being downloaded instead of saving them first and reading them back.
+    The record batches of every file are appended to a TableAccumulator as they are parsed, so a file
+    is held in memory once, as Arrow data, and is never concatenated into a second copy. A file with a value
+    that does not match its declared type is downloaded and read with the fallback of read_csv_table.
+    Other supported formats are downloaded and then read. Files whose local copy matches the manifest
+    are read from the local folder.
+
+    :param y: Object used to download files (e.g., Yandex Disk API)
+    :param list_of_files: List of dictionaries with information about files on disk
+    :param load_path: Path to the local directory for downloaded files
+    :param keep_local_copy: Whether to save the raw bytes to the local folder while parsing
+    :return: dobro_files, other_files, dobro_dataframes, other_dataframes (pyarrow.Table objects;
+             combine them with concat_frames)
+    """
+    manifest = load_manifest(load_path)
+    archive_path = os.path.join(load_path, 'archive')
+
+    read_files = []
+    for file_info in tqdm(sorted(list_of_files, key=lambda file_info: os.path.basename(file_info['path']))):
+        file_name = os.path.basename(file_info['path'])
+        local_file_path = os.path.join(load_path, file_name)
+        if not file_name.endswith(SUPPORTED_EXTENSIONS):  # Read only exported files
+            continue
+
+        downloaded = True
+        try:
+            if is_file_unchanged(file_info, manifest, load_path):
+                read_files.append((file_name, read_export_table(local_file_path)))
+                continue
+
+            # Move the outdated version to the archive before the new one is saved
+            if keep_local_copy and os.path.exists(local_file_path):
+                entry = manifest['files'].get(file_name) or {}
+                archive_file(local_file_path, archive_path, sha256=entry.get('sha256'))
+
+            downloaded = False
+            if file_name.endswith('.csv'):
+                tee_path = local_file_path if keep_local_copy else None
+                accumulator = TableAccumulator()
+                try:
+                    for batch in stream_csv_from_disk(y, file_info, tee_path=tee_path, engine='pyarrow'):
+                        accumulator.append(batch)
+                except pa.ArrowInvalid as e:
+                    # Values that do not match their declared types cannot be fixed in the middle of the stream
+                    print(f"File '{file_name}': {e}. The file is downloaded and read after downloading.")
+                    accumulator = None
+
+                if accumulator is not None:
+                    table = accumulator.to_table()
+                    schema = schema_for_file(file_info['path'])
+                    if schema is not None:
+                        check_nullability(table, schema, file_name)
+                    read_files.append((file_name, table))
+                    downloaded = True
+                    if keep_local_copy:
+                        record_files_in_manifest(manifest, [file_info])
+                    else:
+                        manifest.get('failed_files', {}).pop(file_name, None)
+                    continue
+
+            # Binary formats cannot be parsed incrementally, so they are downloaded first and then read
+            download_file_resumable(y, file_info, local_file_path)
+            record_files_in_manifest(manifest, [file_info])
+            downloaded = True
+            read_files.append((file_name, read_export_table(local_file_path)))
+        except Exception as e:
+            print(f"Error reading file '{file_name}': {e}")
+            # Keep the file for the next run if its local copy was not saved
+            if not downloaded:
+                record_failed_file(manifest, file_info)
+
+    save_manifest(load_path, manifest)
+    return sort_dataframes(read_files, load_path)
+
+
+# Define a generator to read files in chunks
+def iter_file_chunks(load_path, chunksize=100000, files=None):
+    """
+    Reads exported files from the specified directory in alphabetical order and yields them in chunks
+    of a fixed number of rows, so only one chunk is kept in memory at a time. Delimited files are read
+    incrementally; binary formats (pickle, Parquet, Feather) are read whole and then split into chunks.
+
+    :param load_path: Path to the directory containing the files to be read
+    :param chunksize: Number of rows per chunk
+    :param files: Names of the files to be read; all files in the directory if None
+    :return: Generator of tuples (file name, dataset ('customers', 'orders' or 'other'), DataFrame chunk)
+    """
+    for file in sorted(os.listdir(load_path) if files is None else files):
+        if not file.endswith(SUPPORTED_EXTENSIONS):  # Read only exported files
+            continue
+        file_path = os.path.join(load_path, file)
+        group = classify_file(file_path)
+        if file.endswith(('.csv', '.txt')):
+            delimiter = detect_delimiter(file_path)
+            usecols = select_columns(read_csv_header(file_path, delimiter), *column_spec_for_file(file_path))
+            for chunk in pd.read_csv(file_path, sep=delimiter, usecols=usecols, chunksize=chunksize):
+                yield file, group, chunk
+        else:
+            for batch in read_export_table(file_path).to_batches(max_chunksize=chunksize):
+                yield file, group, batch.to_pandas()
+
+
+# DuckDB types for the types used in the schema registry
+DUCKDB_TYPES = {
+    'string': 'VARCHAR',
+    'int64': 'BIGINT',
+    'float64': 'DOUBLE',
+    'bool': 'BOOLEAN',
+    'timestamp': 'TIMESTAMP'
+}
+
+
+# Define a function to quote a column name in an SQL query
+def quote_identifier(name):
+    """
+    Quotes a column or table name for an SQL query.
+
+    :param name: Name
+    :return: Quoted name
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+# Define a function to build a DuckDB query that reads several exported files as one relation
+def duckdb_source_query(load_path, files, con=None, arrow_tables=None):
+    """
+    Builds a query that reads delimited and Parquet files lazily and unions them by column name.
+    Delimited files are read as text, so data types come only from the casts of the transform spec.
+    Files that DuckDB cannot read itself (Feather, pickle) are passed as Arrow tables and registered
+    on the connection as views. The path of the source file of every row is in the 'filename' column.
+
+    :param load_path: Path to the directory containing the files
+    :param files: List of files
+    :param con: DuckDB connection, required for the Arrow tables
+    :param arrow_tables: Dictionary {file name: pyarrow.Table} of files read in advance
+    :return: SQL query
+    """
+    arrow_tables = arrow_tables or {}
+    parts = []
+    for i, file in enumerate(files):
+        file_path = os.path.join(load_path, file)
+        escaped_path = file_path.replace("'", "''")
+        if file in arrow_tables:
+            con.register(f'source_{i}', arrow_tables[file])
+            parts.append(f"SELECT *, '{escaped_path}' AS filename FROM source_{i}")
+        elif file.endswith('.parquet'):
+            parts.append(f"SELECT * FROM read_parquet('{escaped_path}', filename=true)")
+        else:
+            parts.append(f"SELECT * FROM read_csv('{escaped_path}', delim='{detect_delimiter(file_path)}', "
+                         f"header=true, all_varchar=true, filename=true)")
+    return '\nUNION ALL BY NAME\n'.join(parts)
+
+
+# Define a function to translate a transform spec into a DuckDB query
+def duckdb_transform_query(spec, header, source, key_columns=None, schema=None):
+    """
+    Translates the drops, casts and renames of a transform spec into a DuckDB query; values that
+    cannot be converted become NULL (TRY_CAST). Columns of the schema are cast to their declared types,
+    so the tables get the same types as with the pandas backend. With key_columns, rows whose key occurs in an earlier file
+    (in alphabetical order, by the 'filename' column of the source) are removed, as in drop_seen_keys.
+    Derived columns and filters are Python functions and are not translated.
+
+    :param spec: Transform spec
+    :param header: Columns of the source files
+    :param source: Query that reads the source files (see duckdb_source_query)
+    :param key_columns: Columns that identify a row; no de-duplication if None
+    :param schema: Schema registry entry of the dataset; only the casts of the spec are applied if None
+    :return: SQL query
+    """
+    if spec.get('derive') or spec.get('filter'):
+        print('Derived columns and filters of the transform spec are not applied by the DuckDB backend.')
+
+    drop, rename = set(spec.get('drop', ())), spec.get('rename', {})
+    casts = {**{col: col_spec['type'] for col, col_spec in (schema or {}).items() if col_spec['type'] != 'string'},
+             **spec.get('cast', {})}
+    select = []
+    for col in header:
+        if col in drop:
+            continue
+        expression = quote_identifier(col)
+        if col in casts:
+            expression = f'TRY_CAST({expression} AS {DUCKDB_TYPES[casts[col]]})'
+        select.append(f'{expression} AS {quote_identifier(rename.get(col, col))}')
+
+    if key_columns is None:
+        return f"SELECT {', '.join(select)} FROM ({source}) AS source"
+
+    # Keep the rows of the first file with a key; rows without a key are compared by all columns,
+    # as in drop_seen_keys, and keys repeated within one file are kept
+    query = f"SELECT {', '.join(select)}, filename AS __source_file FROM ({source}) AS source"
+    columns = [quote_identifier(rename.get(col, col)) for col in header if col not in drop]
+    keys = [quote_identifier(rename.get(col, col)) for col in key_columns if col in header and col not in drop]
+
+    def first_file(partition, where=''):
+        return (f'SELECT * EXCLUDE (__source_file) FROM ({query}) AS transformed {where}'
+                f"QUALIFY __source_file = min(__source_file) OVER (PARTITION BY {', '.join(partition)})")
+
+    if not keys:
+        return first_file(columns)
+    missing_key = ' OR '.join(key + ' IS NULL' for key in keys)
+    return (first_file(keys, f'WHERE NOT ({missing_key}) ') + ' UNION ALL ' +
+            first_file(columns, f'WHERE {missing_key} '))
+
+
+# Define a function to attach the SQLite database to DuckDB
+def attach_sqlite_database(con, db_path):
+    """
+    Loads the sqlite extension of DuckDB, installing it if needed (which requires network access),
+    and attaches the database as 'target'.
+
+    :param con: DuckDB connection
+    :param db_path: Path to the database
+    :return: True if the database is attached, False if the extension is not available
+    """
+    try:
+        try:
+            con.execute('LOAD sqlite')
+        except duckdb.Error:
+            con.execute('INSTALL sqlite')
+            con.execute('LOAD sqlite')
+        con.execute(f"ATTACH '{db_path}' AS target (TYPE SQLITE)")
+        return True
+    except duckdb.Error as e:
+        print(f'The sqlite extension of DuckDB is not available ({e}); the results are written through sqlite3.')
+        return False
+
+
+# Define a function to write the result of a DuckDB query into the SQLite database batch by batch
+def write_duckdb_query_to_sqlite(con, query, db_path, table_name, chunksize=100000):
+    """
+    Streams the result of a DuckDB query as Arrow record batches and appends them to a table of the
+    SQLite database with sqlite3, for when the sqlite extension of DuckDB cannot be loaded.
+
+    :param con: DuckDB connection
+    :param query: SQL query
+    :param db_path: Path to the database
+    :param table_name: Name of the table
+    :param chunksize: Number of rows written at a time
+    """
+    result = con.execute(query)
+    # fetch_record_batch is deprecated in newer versions of DuckDB in favor of to_arrow_reader
+    reader = result.to_arrow_reader(chunksize) if hasattr(result, 'to_arrow_reader') else \
+        result.fetch_record_batch(chunksize)
+    conn = sl.connect(db_path)
+    try:
+        written = False
+        for batch in reader:
+            batch.to_pandas().to_sql(table_name, conn, if_exists='append', index=False)
+            written = True
+        if not written:  # Create the table even if there are no rows
+            reader.schema.empty_table().to_pandas().to_sql(table_name, conn, index=False)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# Define a function to transform and load the datasets with DuckDB without holding them in memory
+def duckdb_load_to_sql(load_path, db_path='aif.sql', memory_limit='4GB', temp_directory=None):
+    """
+    Out-of-core alternative to the pandas preprocessing: reads the customers and orders exports
+    as a lazy DuckDB query plan, applies the drops, casts and renames of the transform specs, removes
+    columns with 100% missing values, reports the proportion of missing values and writes the result
+    straight into the SQLite database. DuckDB streams CSV, '.txt' and Parquet files and spills to
+    temp_directory when the data does not fit into memory_limit; Feather files are memory-mapped and
+    pickle files (if allowed, see allow_pickle_files) are loaded into memory. Without the sqlite extension
+    of DuckDB (e.g., no network access to install it), the result is written batch by batch with sqlite3.
+
+    :param load_path: Path to the directory containing the files to be read
+    :param db_path: Path to the database
+    :param memory_limit: Memory limit of DuckDB (e.g., '4GB')
+    :param temp_directory: Directory for data spilled to disk; 'duckdb_tmp' in load_path if None
+    :return: Dictionary with the number of loaded rows per table, or None if DuckDB is not installed
+    """
+    if duckdb is None:
+        print('DuckDB is not installed; use the pandas backend.')
+        return None
+
+    files = sorted(file for file in os.listdir(load_path) if file.endswith(SUPPORTED_EXTENSIONS))
+    temp_directory = temp_directory or os.path.join(load_path, 'duckdb_tmp')
+
+    # Tables and views written by earlier runs (and the ledger of the incremental load) are removed first,
+    # since the database is attached by DuckDB
+    conn = sl.connect(db_path)
+    try:
+        for table_name in ['customers', 'orders', 'etl_ledger']:
+            drop_table_or_view(conn, table_name)
+        conn.commit()
+    finally:
+        conn.close()
+
+    rows = {'customers': 0, 'orders': 0}
+    con = duckdb.connect()
+    try:
+        con.execute(f"SET memory_limit = '{memory_limit}'")
+        con.execute(f"SET temp_directory = '{temp_directory}'")
+        con.execute('SET preserve_insertion_order = false')  # Lets large results be written without buffering
+        attached = attach_sqlite_database(con, db_path)
+
+        for table_name, spec, key_columns, schema in [
+                ('customers', CUSTOMERS_TRANSFORMS, CUSTOMERS_KEY_COLUMNS, CUSTOMERS_SCHEMA),
+                ('orders', ORDERS_TRANSFORMS, ORDERS_KEY_COLUMNS, ORDERS_SCHEMA)]:
+            dataset_files = [file for file in files if classify_file(os.path.join(load_path, file)) == table_name]
+
+            # Feather and pickle files are read as Arrow tables; files that cannot be read are reported and skipped
+            arrow_tables = {}
+            for file in [file for file in dataset_files if file.endswith(('.feather', '.pkl'))]:
+                try:
+                    arrow_tables[file] = read_export_table(os.path.join(load_path, file))
+                except Exception as e:
+                    print(f"Error reading file '{file}': {e}")
+                    dataset_files.remove(file)
+
+            if not dataset_files:
+                print(f'No {table_name} files found in folder.')
+                continue
+
+            header = dict.fromkeys(read_dataset_header(load_path, [file for file in dataset_files
+                                                                   if file not in arrow_tables]))
+            for table in arrow_tables.values():
+                header.update(dict.fromkeys(table.column_names))
+            header = list(header)
+            source = duckdb_source_query(load_path, dataset_files, con, arrow_tables)
+            query = duckdb_transform_query(spec, header, source, key_columns, schema)
+            con.execute(f'CREATE OR REPLACE TEMP VIEW {table_name}_transformed AS {query}')
+
+            # Count non-missing values of all columns in one scan
+            columns = [col for col in transformed_columns(spec, header) if col not in spec.get('derive', {})]
+            counts = con.execute(f"SELECT count(*), {', '.join(f'count({quote_identifier(col)})' for col in columns)} "
+                                 f'FROM {table_name}_transformed').fetchone()
+            rows[table_name] = counts[0]
+            null_shares = pd.Series({col: (1 - count / counts[0]) * 100 if counts[0] else 0.0
+                                     for col, count in zip(columns, counts[1:])})
+
+            empty_columns = [col for col, count in zip(columns, counts[1:]) if count == 0]
+            if empty_columns:
+                print(f'Removed columns with 100% missing values from {table_name}:', empty_columns)
+            print(f'Proportion of missing values in {table_name}:')
+            print(pd.DataFrame(round(null_shares.drop(empty_columns), 5)).sort_values(by=0))
+
+            kept_columns = ', '.join(quote_identifier(col) for col in columns if col not in empty_columns)
+            result_query = f'SELECT {kept_columns} FROM {table_name}_transformed'
+            if attached:
+                con.execute(f'CREATE TABLE target.{table_name} AS {result_query}')
+            else:
+                write_duckdb_query_to_sqlite(con, result_query, db_path, table_name)
+
+        print(f"Loaded {rows['customers']} rows into customers and {rows['orders']} rows into orders.")
+    finally:
+        con.close()
+
+    return rows
+
+
+# Define a function to read the ledger of files loaded into the database
+def read_ledger(conn):
+    """
+    Reads the ledger of source files whose rows are in the database.
+
+    :param conn: Connection to the database
+    :return: Dictionary {file name: SHA-256 hash}; empty if there is no ledger
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'etl_ledger'").fetchone() is None:
+        return {}
+    return dict(conn.execute('SELECT source_file, sha256 FROM etl_ledger').fetchall())
+
+
+# Define a function to record files loaded into the database in the ledger
+def record_in_ledger(conn, file, sha256, dataset, rows, duplicates=None):
+    """
+    Records a source file, its hash, dataset, number of loaded rows and number of rows removed
+    as duplicates of other files in the ledger.
+
+    :param conn: Connection to the database
+    :param file: Name of the file
+    :param sha256: SHA-256 hash of the file
+    :param dataset: 'customers' or 'orders'
+    :param rows: Number of loaded rows
+    :param duplicates: Number of rows removed as duplicates; None if unknown
+    """
+    conn.execute('CREATE TABLE IF NOT EXISTS etl_ledger (source_file TEXT PRIMARY KEY, sha256 TEXT, dataset TEXT, '
+                 'rows INTEGER, loaded_at TEXT, duplicates INTEGER)')
+    # Ledgers written before the duplicates column was added get it (NULL means unknown)
+    if 'duplicates' not in [row[1] for row in conn.execute('PRAGMA table_info(etl_ledger)').fetchall()]:
+        conn.execute('ALTER TABLE etl_ledger ADD COLUMN duplicates INTEGER')
+    conn.execute('INSERT OR REPLACE INTO etl_ledger (source_file, sha256, dataset, rows, loaded_at, duplicates) '
+                 'VALUES (?, ?, ?, ?, ?, ?)',
+                 (file, sha256, dataset, rows, datetime.now(timezone.utc).isoformat(), duplicates))
+
+
+# Define a function to delete the rows loaded from a source file
+def delete_source_file_rows(conn, file, tables=('customers', 'orders')):
+    """
+    Deletes the rows tagged with a source file from the tables and removes the file from the ledger.
+
+    :param conn: Connection to the database
+    :param file: Name of the file
+    :param tables: Tables with the SourceFile column
+    """
+    for table_name in tables:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)).fetchone():
+            conn.execute(f'DELETE FROM "{table_name}" WHERE SourceFile = ?', (file,))
+    if read_ledger(conn):
+        conn.execute('DELETE FROM etl_ledger WHERE source_file = ?', (file,))
+
+
+# Define a function to find the files whose rows were removed as duplicates of the given files
+def files_sharing_keys(conn, files):
+    """
+    Finds the files in the ledger that had rows removed as duplicates and belong to the same datasets
+    as the given files. When the rows of the given files are deleted, those duplicates are no longer
+    in the database, so these files have to be loaded again. Files recorded without the number of
+    duplicates (by older versions of the ledger) are included as well.
+
+    :param conn: Connection to the database
+    :param files: Names of the files whose rows are deleted
+    :return: List of file names
+    """
+    files = list(files)
+    if not files or not read_ledger(conn):
+        return []
+    if 'duplicates' not in [row[1] for row in conn.execute('PRAGMA table_info(etl_ledger)').fetchall()]:
+        condition = '1 = 1'
+    else:
+        condition = '(duplicates IS NULL OR duplicates > 0)'
+    placeholders = ', '.join('?' * len(files))
+    query = (f'SELECT source_file FROM etl_ledger WHERE {condition} AND dataset IN '
+             f'(SELECT dataset FROM etl_ledger WHERE source_file IN ({placeholders}))')
+    return [row[0] for row in conn.execute(query, files).fetchall()]
+
+
+# Define a function to add the columns of a chunk missing from a table
+def add_missing_columns(conn, table_name, df):
+    """
+    Adds the columns of a DataFrame that a table does not have yet, so a chunk of a file with new columns
+    can be appended to the table. Rows already in the table get NULL in the new columns.
+    Nothing is done if the table does not exist.
+
+    :param conn: Connection to the database
+    :param table_name: Name of the table
+    :param df: DataFrame to be appended
+    :return: List of added columns
+    """
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()]
+    if not columns:
+        return []
+
+    added = []
+    for col in df.columns:
+        if col in columns:
+            continue
+        values = df[col]
+        # The same types pandas gives the columns when it creates the table
+        if pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+            col_type = 'INTEGER'
+        elif pd.api.types.is_float_dtype(values):
+            col_type = 'REAL'
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            col_type = 'TIMESTAMP'
+        else:
+            col_type = 'TEXT'
+        conn.execute(f'ALTER TABLE "{table_name}" ADD COLUMN {quote_identifier(col)} {col_type}')
+        added.append(col)
+    if added:
+        print(f"Added columns to {table_name}: {', '.join(added)}.")
+    return added
+
+
+# Define a function to read the keys of the rows already loaded into a table
+def load_seen_keys(conn, table_name, key_columns, chunksize=100000):
+    """
+    Reads the keys of the rows in a table as 64-bit hashes (see hash_keys), so rows loaded by earlier runs
+    are not loaded again from overlapping files. Rows without a key are not read.
+
+    :param conn: Connection to the database
+    :param table_name: Name of the table
+    :param key_columns: Columns that identify a row
+    :param chunksize: Number of rows read at a time
+    :return: KeyIndex of the keys
+    """
+    seen_keys = KeyIndex()
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()]
+    subset = [col for col in key_columns if col in columns]
+    if not subset:
+        return seen_keys
+
+    query = f"SELECT {', '.join(quote_identifier(col) for col in subset)} FROM \"{table_name}\""
+    schema = {**CUSTOMERS_SCHEMA, **ORDERS_SCHEMA}
+    for chunk in pd.read_sql(query, conn, chunksize=chunksize):
+        chunk = chunk[chunk.notna().all(axis=1)]
+        # Keys get the types of the schema registry, as the keys of the chunks read from the files
+        chunk = pd.DataFrame({col: cast_series(chunk[col], schema[col]['type']) if col in schema else chunk[col]
+                              for col in subset})
+        seen_keys.add(hash_keys(chunk, subset))
+    return seen_keys
+
+
+# Define a function to preprocess files chunk by chunk and load them into the database
+def stream_files_to_sql(load_path, db_path='aif.sql', chunksize=100000, incremental=False):
+    """
+    Reads customers and orders exports in chunks, preprocesses every chunk in one pass with the transform
+    specs and appends it to the customers and orders tables, so the full datasets are never held in memory.
+    Exports may overlap (e.g., 'dobro' exports of overlapping periods, orders split by quarter); actions
+    and order lines repeated across them are loaded once (see drop_seen_keys).
+    Columns with 100% missing values are not removed in this mode, since that requires the whole dataset.
+
+    In the incremental mode every row is tagged with its source file (SourceFile column), and the files
+    loaded into the database are recorded with their hashes in the 'etl_ledger' table. Only new and changed
+    files are read; the rows of changed and removed files are deleted before the new version is appended,
+    and files that had rows removed as duplicates of the deleted rows are loaded again. Columns that
+    new files add are added to the tables. Without a ledger (e.g., after a full reload) the tables are rebuilt from all files.
+
+    :param load_path: Path to the directory containing the files to be read
+    :param db_path: Path to the database
+    :param chunksize: Number of rows per chunk
+    :param incremental: Whether to load only new and changed files
+    :return: Dictionary with the number of loaded rows per table
+    """
+    rows = {'customers': 0, 'orders': 0}
+    transforms = {'customers': compile_transforms(CUSTOMERS_TRANSFORMS), 'orders': compile_transforms(ORDERS_TRANSFORMS)}
+    # Actions and order lines repeated in several files are loaded once
+    key_columns = {'customers': CUSTOMERS_KEY_COLUMNS, 'orders': ORDERS_KEY_COLUMNS}
+    seen_keys = {'customers': KeyIndex(), 'orders': KeyIndex()}
+    null_stats = {'customers': NullStatsAccumulator(), 'orders': NullStatsAccumulator()}
+    conn = sl.connect(db_path)
+
+    try:
+        files = sorted(file for file in os.listdir(load_path) if file.endswith(SUPPORTED_EXTENSIONS)
+                       and classify_file(os.path.join(load_path, file)) in transforms)
+        ledger = read_ledger(conn) if incremental else {}
+
+        if incremental:
+            # Hashes reported by the disk are taken from the manifest; other files are hashed locally
+            manifest_files = load_manifest(load_path)['files']
+            hashes = {file: (manifest_files.get(file) or {}).get('sha256') or
+                      calculate_file_hash(os.path.join(load_path, file), 'sha256') for file in files}
+
+            if ledger:
+                files_to_load = [file for file in files if ledger.get(file) != hashes[file]]
+                # Rows of changed files, of files removed from the folder and of files loaded by an interrupted run
+                files_to_delete = set(ledger) - set(files) | set(files_to_load)
+                # Rows of the remaining files removed as duplicates of the deleted rows are loaded again
+                files_to_reload = set(files_sharing_keys(conn, files_to_delete & set(ledger))) & set(files)
+                files_to_load = sorted(set(files_to_load) | files_to_reload)
+                for file in files_to_delete | files_to_reload:
+                    delete_source_file_rows(conn, file)
+                conn.commit()
+                seen_keys = {table_name: load_seen_keys(conn, table_name, key_columns[table_name])
+                             for table_name in seen_keys}
+                print(f'Files to load: {len(files_to_load)}, unchanged files: {len(files) - len(files_to_load)}.')
+            else:
+                files_to_load = files
+        else:
+            files_to_load = files
+
+        if not ledger:
+            # The tables are rebuilt from all files: tables and views written by earlier runs are removed,
+            # and so is the ledger, which does not apply to tables without the SourceFile column
+            for table_name in ['customers', 'orders', 'etl_ledger']:
+                drop_table_or_view(conn, table_name)
+            conn.commit()
+
+        loaded_files = {}
+        duplicates = {}
+        # Keys of the file being read; they are compared with the following files only
+        current_file, current_group, file_keys = None, None, KeyIndex()
+        for file, group, chunk in tqdm(iter_file_chunks(load_path, chunksize, files_to_load)):
+            if group not in transforms:
+                continue
+            if file != current_file:
+                if current_file is not None:
+                    seen_keys[current_group].merge(file_keys)
+                current_file, current_group, file_keys = file, group, KeyIndex()
+            table_name = group
+            chunk, chunk_duplicates = drop_seen_keys(transforms[group](chunk), key_columns[group], seen_keys[group],
+                                                     file_keys)
+            duplicates[file] = duplicates.get(file, 0) + chunk_duplicates
+            null_stats[group].update(chunk)
+
+            if incremental:
+                chunk['SourceFile'] = file
+                if_exists = 'append'
+            else:
+                # The first chunk replaces the table, the following ones are appended to it
+                if_exists = 'replace' if rows[table_name] == 0 else 'append'
+            if if_exists == 'append':
+                # Files with columns the table does not have yet
+                add_missing_columns(conn, table_name, chunk)
+            chunk.to_sql(table_name, conn, if_exists=if_exists, index=False)
+            rows[table_name] += len(chunk)
+            loaded_files[file] = (group, loaded_files.get(file, (group, 0))[1] + len(chunk))
+
+        if incremental:
+            for table_name in ['customers', 'orders']:
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                (table_name,)).fetchone():
+                    conn.execute(f'CREATE INDEX IF NOT EXISTS "{table_name}_source_file" ON "{table_name}" (SourceFile)')
+            for file, (group, file_rows) in loaded_files.items():
+                record_in_ledger(conn, file, hashes[file], group, file_rows, duplicates.get(file, 0))
+            conn.commit()
+
+        for file, file_duplicates in duplicates.items():
+            if file_duplicates:
+                print(f"File '{file}': removed {file_duplicates} duplicate rows.")
+        for table_name, table_null_stats in null_stats.items():
+            if table_null_stats.rows:
+                print(f'Proportion of missing values in the rows loaded into {table_name}:')
+                print(pd.DataFrame(round(table_null_stats.missing_percentages(), 5)).sort_values(by=0))
+        print(f"Loaded {rows['customers']} rows into customers and {rows['orders']} rows into orders.")
+    finally:
+        conn.close()
+
+    return rows
+
+
+# Define a coroutine to list files on disk page by page with the asynchronous client
+async def list_disk_files_async(client, path='aif_etl', page_size=100):
+    """
+    Lists files in a folder on disk with the asynchronous client, requesting them page by page.
+
+    :param client: Asynchronous disk client (e.g., yadisk.AsyncYaDisk)
+    :param path: Path to the folder on disk
+    :param page_size: Number of files requested per page
+    :return: List of dictionaries with the path, upload date, size and hashes of the files
+    """
+    listing = client.listdir(path, limit=page_size)
+    # Older versions of the client return the generator from a coroutine
+    if asyncio.iscoroutine(listing):
+        listing = await listing
+
+    list_of_files = []
+    async for el in listing:
+        if el['path'].endswith(SUPPORTED_EXTENSIONS):
+            list_of_files.append(make_file_info(el))
+    return list_of_files
+
+
+# Define a coroutine to download a single file with the asynchronous client, with retries
+async def download_file_async(client, file_info, local_file_path, retries=3, backoff=1.0):
+    """
+    Downloads a single file with the asynchronous client, retrying failed attempts with exponential backoff
+    as download_file_with_retry does. A new download link is requested for every attempt, and every retry
+    continues the interrupted '.part' file.
+
+    :param client: Asynchronous disk client (e.g., yadisk.AsyncYaDisk)
+    :param file_info: Dictionary with the path, size and hashes of the file on disk
+    :param local_file_path: Path where the file is saved in the local folder
+    :param retries: Number of retries after the first failed attempt
+    :param backoff: Delay in seconds before the first retry, doubled for every next retry
+    :return: Number of attempts
+    """
+    file_name = os.path.basename(file_info['path'])
+
+    for attempt in range(1, retries + 2):
+        try:
+            link = await client.get_download_link(file_info['path'])
+            await asyncio.to_thread(download_file_resumable, None, file_info, local_file_path, link=link)
+            return attempt
+        except Exception as e:
+            if attempt > retries:
+                raise
+            delay = backoff * 2 ** (attempt - 1)
+            print(f"Error downloading file '{file_name}' (attempt {attempt}): {e}. Retrying in {delay} s...")
+            await asyncio.sleep(delay)
+
+
+# Define a coroutine to download files and read them as soon as each one is ready
+async def extract_files_async(client, load_path, max_concurrency=4, page_size=100, executor=None,
+                              retries=3, backoff=1.0):
+    """
+    Lists the 'aif_etl' folder on disk, downloads new and changed files concurrently and starts
+    reading every file as soon as it lands, so network waits overlap with parsing.
+    Unchanged files are not downloaded and are read straight from the local folder.
+
+    :param client: Asynchronous disk client (e.g., yadisk.AsyncYaDisk)
+    :param load_path: Path to the local directory for downloading files
+    :param max_concurrency: Maximum number of simultaneous downloads
+    :param page_size: Number of files requested per page of the listing
+    :param executor: Executor used for parsing; the default thread pool of the event loop if None
+    :param retries: Number of retries for each download
+    :param backoff: Delay in seconds before the first retry
+    :return: dobro_files, other_files, dobro_dataframes, other_dataframes (pyarrow.Table objects;
+             combine them with concat_frames)
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    archive_path = os.path.join(load_path, 'archive')
+    os.makedirs(archive_path, exist_ok=True)
+    manifest = load_manifest(load_path)
+
+    list_of_files = await list_disk_files_async(client, 'aif_etl', page_size)
+    print(f'Files on disk: {len(list_of_files)}')
+
+    async def download_and_read(file_info):
+        file_name = os.path.basename(file_info['path'])
+        local_file_path = os.path.join(load_path, file_name)
+
+        try:
+            if not await asyncio.to_thread(is_file_unchanged, file_info, manifest, load_path):
+                # Move the outdated version to the archive before downloading the new one
+                if os.path.exists(local_file_path):
+                    entry = manifest['files'].get(file_name) or {}
+                    await asyncio.to_thread(archive_file, local_file_path, archive_path, entry.get('sha256'))
+                async with semaphore:
+                    try:
+                        await download_file_async(client, file_info, local_file_path, retries, backoff)
+                    except Exception:
+                        record_failed_file(manifest, file_info)
+                        raise
+                record_files_in_manifest(manifest, [file_info])
+                print(f"Downloaded '{file_name}'")
+
+            if not file_name.endswith(SUPPORTED_EXTENSIONS):  # Read only exported files
+                return file_name, None
+            return file_name, await loop.run_in_executor(executor, read_export_table, local_file_path)
+        except Exception as e:
+            print(f"Error processing file '{file_name}': {e}")
+            return file_name, None
+
+    read_files = []
+    tasks = [asyncio.ensure_future(download_and_read(file_info)) for file_info in list_of_files]
+    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks)):
+        file_name, df = await task
+        if df is not None:
+            read_files.append((file_name, df))
+
+    save_manifest(load_path, manifest)
+
+    # Keep the same alphabetical order as the synchronous reader
+    read_files.sort(key=lambda read_file: read_file[0])
+    return sort_dataframes(read_files, load_path)
+
+
+# Define a function to run the asynchronous extract stage
+def run_async_extract(app_id, secret_id, ya_token, load_path, **kwargs):
+    """
+    Creates an asynchronous Yandex Disk client and runs extract_files_async with it.
+
+    :param app_id: Application ID for Yandex Disk
+    :param secret_id: Application secret for Yandex Disk
+    :param ya_token: OAuth token for Yandex Disk
+    :param load_path: Path to the local directory for downloading files
+    :param kwargs: Additional arguments for extract_files_async
+    :return: dobro_files, other_files, dobro_dataframes, other_dataframes
+    """
+    async def run():
+        async with yadisk.AsyncYaDisk(app_id, secret_id, ya_token) as client:
+            return await extract_files_async(client, load_path, **kwargs)
+
+    return run_coroutine(run())
+
+
+# Define a function to run a coroutine from synchronous code
+def run_coroutine(coroutine):
+    """
+    Runs a coroutine to completion and returns its result. asyncio.run cannot be called while an event loop
+    is running (e.g., in a Jupyter notebook), so in that case the coroutine runs in its own event loop
+    in a separate thread.
+
+    :param coroutine: Coroutine object
+    :return: Result of the coroutine
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
 
 
 # Define a function to remove columns with 100% missing values
-def remove_empty_columns(df):
+def remove_empty_columns(df, null_stats=None):
 
-    # Find columns with 100% missing values
-    empty_columns = df.columns[df.isna().sum() == len(df)]
+    # Find columns with 100% missing values (from the statistics collected while reading, if given)
+    if null_stats is not None:
+        empty_columns = [col for col in null_stats.empty_columns() if col in df.columns]
+    else:
+        empty_columns = df.columns[df.isna().sum() == len(df)]
     
     # Remove columns with 100% missing values
     df.drop(columns=empty_columns, inplace=True)
+    if null_stats is not None:
+        null_stats.retain(df.columns)
 
 
 # Define function to load data into PostgreSQL through a buffer table with a check for table existence
@@ -433,22 +3238,26 @@ def histograms(dataset, name, color, exclude_cols):
 
 
 # Define a function to display basic information about the dataset
-def display_dataset_info(df):
+def display_dataset_info(df, null_stats=None):
     """
     Function to output basic information about the dataset, including a sample,
     overall information, and the number of missing values sorted in ascending order.
 
     Args:
         df (pd.DataFrame): The dataset for analysis.
+        null_stats (NullStatsAccumulator): Missing values counted while reading; the dataset is scanned if None.
     """
-    # Print overall information about the dataset
+    # Print overall information about the dataset (non-null counts are not computed when they are known)
     print('Dataset info:')
-    display(df.info())
+    display(df.info(show_counts=null_stats is None))
     print()
     
     # Count of missing values
     print('Number of missing values:')
-    display(df.isna().sum().sort_values())
+    if null_stats is not None:
+        display(null_stats.counts().reindex(df.columns, fill_value=0).sort_values())
+    else:
+        display(df.isna().sum().sort_values())
 
 
 # Define a function to determine the segment.
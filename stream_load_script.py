@@ -0,0 +1,63 @@
+# Importing modules
+import yadisk
+import some_functions
+from datetime import datetime, timezone
+import warnings; warnings.filterwarnings(action = 'ignore')
+
+# Loading environment variables for Yandex Disk
+app_id = ''
+secret_id = ''
+ya_token = ''
+
+# Number of rows read, preprocessed and loaded at a time
+CHUNK_SIZE = 100000
+
+# Load only new and changed files: rows are tagged with their source file, and the loaded files are recorded
+# in the 'etl_ledger' table of the database (the 'pandas' backend only)
+INCREMENTAL_LOAD = True
+
+# Transform backend: 'pandas' - read, preprocess and load the files chunk by chunk;
+# 'duckdb' - run the preprocessing as a DuckDB query plan that spills to disk and writes straight into the database
+TRANSFORM_BACKEND = 'pandas'
+DUCKDB_MEMORY_LIMIT = '4GB'
+
+# Read pickle ('.pkl') exports; loading a pickle file can run arbitrary code, so enable it only for trusted files
+READ_PICKLE_FILES = False
+
+# Start time of this run
+run_started_at = datetime.now(timezone.utc)
+
+# Connecting to Yandex Disk
+y = yadisk.YaDisk(app_id, secret_id, ya_token)
+
+# Checking the connection by validating the token
+if y.check_token():
+    print('Disk token correct')
+
+print()
+
+# Pickle exports are read only if enabled above
+some_functions.allow_pickle_files(READ_PICKLE_FILES)
+
+# Read files from the disk, check for their presence in the local directory, and download them if they are not present
+list_of_files, load_path, files_with_dates = some_functions.create_file_list_and_load_path(y, since_last_run=True)
+
+print()
+
+# Check for new files and files changed on disk, download them and compress the outdated files into the archive
+some_functions.check_and_update_files(y, list_of_files, load_path)
+
+print()
+
+if TRANSFORM_BACKEND == 'duckdb':
+    # Preprocess the files as a lazy query plan and write the result into the database;
+    # columns with 100% missing values are removed and the proportion of missing values is reported
+    rows = some_functions.duckdb_load_to_sql(load_path, memory_limit=DUCKDB_MEMORY_LIMIT)
+else:
+    # Read the files chunk by chunk, preprocess every chunk and load it into the database,
+    # so the customers and orders datasets are never held in memory as a whole
+    rows = some_functions.stream_files_to_sql(load_path, chunksize=CHUNK_SIZE, incremental=INCREMENTAL_LOAD)
+
+# Remember the start of this run, so the next run lists only files changed after it
+if rows is not None:
+    some_functions.mark_successful_run(load_path, run_started_at)
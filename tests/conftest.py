@@ -0,0 +1,133 @@
+import hashlib
+import os
+import pathlib
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import some_functions  # noqa: E402
+
+
+class FakeYaDisk:
+    """
+    Stands in for yadisk.YaDisk: serves the files of a local folder as the 'aif_etl' folder on disk.
+    Download links are file:// URLs, so the real download code is exercised.
+    """
+
+    def __init__(self, remote_path):
+        self.remote_path = remote_path
+        self.failures = {}  # File name -> number of download attempts that fail
+        self.md5_overrides = {}  # File name -> md5 reported instead of the real one
+        self.modified = {}  # File name -> modification date reported by the disk
+        self.link_requests = []
+
+    def entry(self, name):
+        file_path = os.path.join(self.remote_path, name)
+        with open(file_path, 'rb') as file:
+            data = file.read()
+        return {
+            'path': f'disk:/aif_etl/{name}',
+            'type': 'file',
+            'modified': self.modified.get(name, datetime(2024, 1, 1, tzinfo=timezone.utc)),
+            'size': len(data),
+            'md5': self.md5_overrides.get(name, hashlib.md5(data).hexdigest()),
+            'sha256': hashlib.sha256(data).hexdigest()
+        }
+
+    def listdir(self, path, limit=None, sort=None):
+        entries = [self.entry(name) for name in os.listdir(self.remote_path)]
+        return iter(sorted(entries, key=lambda el: el['modified'], reverse=True))
+
+    def get_download_link(self, path):
+        name = os.path.basename(path)
+        self.link_requests.append(name)
+        if self.failures.get(name):
+            self.failures[name] -= 1
+            raise ConnectionError(f'temporary failure for {name}')
+        return pathlib.Path(self.remote_path, name).as_uri()
+
+
+class FakeAsyncYaDisk:
+    """
+    Stands in for yadisk.AsyncYaDisk on top of FakeYaDisk.
+    """
+
+    def __init__(self, disk):
+        self.disk = disk
+
+    def listdir(self, path, limit=None):
+        async def listing():
+            for el in self.disk.listdir(path, limit):
+                yield el
+        return listing()
+
+    async def get_download_link(self, path):
+        return self.disk.get_download_link(path)
+
+
+def write_export(path, columns, rows):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(';'.join(columns) + '\n')
+        for row in rows:
+            file.write(';'.join(str(row.get(col, '')) for col in columns) + '\n')
+
+
+def customers_row(i, **values):
+    row = {col: '' for col in some_functions.CUSTOMERS_SCHEMA}
+    row.update({
+        'CustomerActionIdsMindboxId': 100 + i,
+        'CustomerActionActionTemplateName': 'Donation',
+        'CustomerActionDateTimeUtc': f'2024-03-1{i} 10:00:00.000',
+        'CustomerActionChannelIdsMindboxId': 7,
+        'CustomerActionChannelName': 'VK',
+        'CustomerActionCustomerIdsMindboxId': 1000 + i
+    })
+    row.update(values)
+    return row
+
+
+def orders_row(order_id, **values):
+    row = {col: '' for col in some_functions.ORDERS_SCHEMA}
+    row.update({
+        'OrderIdsWebsiteID': order_id,
+        'OrderLineProductIdsWebsite': 'p1',
+        'OrderLineStatusIdsExternalId': 'paid',
+        'OrderTotalPrice': 100
+    })
+    row.update(values)
+    return row
+
+
+@pytest.fixture
+def remote_path(tmp_path):
+    path = tmp_path / 'remote'
+    path.mkdir()
+    return str(path)
+
+
+@pytest.fixture
+def load_path(tmp_path):
+    path = tmp_path / 'aif_etl'
+    path.mkdir()
+    return str(path)
+
+
+@pytest.fixture
+def disk(remote_path):
+    return FakeYaDisk(remote_path)
+
+
+@pytest.fixture
+def put_file(remote_path):
+    def put(name, text):
+        with open(os.path.join(remote_path, name), 'w', encoding='utf-8') as file:
+            file.write(text)
+    return put
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr('time.sleep', lambda seconds: None)
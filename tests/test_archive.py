@@ -0,0 +1,52 @@
+import hashlib
+import os
+
+import pytest
+
+import some_functions
+
+
+def write_file(path, data):
+    with open(path, 'wb') as file:
+        file.write(data)
+
+
+def test_archive_is_named_by_local_contents(tmp_path):
+    local_file_path = str(tmp_path / 'a.csv')
+    archive_path = str(tmp_path / 'archive')
+    data = b'x;y\n1;2\n'
+    write_file(local_file_path, data)
+
+    blob_path = some_functions.archive_file(local_file_path, archive_path, sha256='0' * 64)
+
+    sha256 = hashlib.sha256(data).hexdigest()
+    assert os.path.basename(blob_path).startswith(sha256)
+    assert [v['sha256'] for v in some_functions.load_archive_index(archive_path)['a.csv']] == [sha256]
+    assert not os.path.exists(local_file_path)
+
+    restored_path = some_functions.restore_archived_file(archive_path, 'a.csv', str(tmp_path / 'restored.csv'))
+    with open(restored_path, 'rb') as file:
+        assert file.read() == data
+
+
+def test_identical_versions_are_stored_once(tmp_path):
+    local_file_path = str(tmp_path / 'a.csv')
+    archive_path = str(tmp_path / 'archive')
+    for _ in range(2):
+        write_file(local_file_path, b'x;y\n1;2\n')
+        some_functions.archive_file(local_file_path, archive_path)
+
+    assert len(os.listdir(os.path.join(archive_path, 'blobs'))) == 1
+    assert len(some_functions.load_archive_index(archive_path)['a.csv']) == 1
+
+
+def test_restore_zstd_blob_without_zstandard(tmp_path, monkeypatch):
+    pytest.importorskip('zstandard')
+    local_file_path = str(tmp_path / 'a.csv')
+    archive_path = str(tmp_path / 'archive')
+    write_file(local_file_path, b'x;y\n1;2\n')
+    some_functions.archive_file(local_file_path, archive_path)
+
+    monkeypatch.setattr(some_functions, 'zstandard', None)
+    with pytest.raises(ImportError, match='zstandard'):
+        some_functions.restore_archived_file(archive_path, 'a.csv', str(tmp_path / 'restored.csv'))
@@ -0,0 +1,50 @@
+import pandas as pd
+import pyarrow as pa
+
+import some_functions
+
+
+def make_columns(rows, distinct):
+    return {'channel': [f'channel_{i % 2}' for i in range(rows)],
+            'campaign': [f'campaign_{i % distinct}' for i in range(rows)],
+            'id': [f'id_{i}' for i in range(rows)]}
+
+
+def test_cardinality_limit_grows_with_the_number_of_rows():
+    table = pa.table(make_columns(100000, 20000))
+
+    encoded = some_functions.dictionary_encode_table(table, 0.5)
+
+    assert pa.types.is_dictionary(encoded.schema.field('channel').type)
+    assert pa.types.is_dictionary(encoded.schema.field('campaign').type)
+    assert not pa.types.is_dictionary(encoded.schema.field('id').type)
+
+
+def test_encode_categories_uses_the_same_ratio():
+    df = pd.DataFrame(make_columns(1000, 800))
+
+    assert some_functions.encode_categories(df, 0.5) == ['channel']
+    assert isinstance(df['channel'].dtype, pd.CategoricalDtype)
+
+
+def test_concat_frames_encodes_tables_and_frames_alike():
+    columns = make_columns(10, 2)
+    from_tables = some_functions.concat_frames([pa.table(columns)], max_cardinality_ratio=0.5)
+    from_frames = some_functions.concat_frames([pd.DataFrame(columns)], max_cardinality_ratio=0.5)
+
+    for df in (from_tables, from_frames):
+        assert isinstance(df['campaign'].dtype, pd.CategoricalDtype)
+        assert not isinstance(df['id'].dtype, pd.CategoricalDtype)
+
+
+def test_high_cardinality_column_is_not_encoded():
+    rows = 100000
+    table = pa.table({'website_id': [f'site_{i % 43000}' for i in range(rows)],
+                      'campaign': [f'campaign_{i % 5000}' for i in range(rows)]})
+
+    df = some_functions.concat_frames([table], max_cardinality_ratio=0.05)
+
+    assert not isinstance(df['website_id'].dtype, pd.CategoricalDtype)
+    assert isinstance(df['campaign'].dtype, pd.CategoricalDtype)
+    # At the limit the categorical column still takes less memory than the strings
+    assert df['campaign'].memory_usage(deep=True) < df['campaign'].astype(str).memory_usage(deep=True)
@@ -0,0 +1,38 @@
+import pandas as pd
+import pyarrow as pa
+
+import some_functions
+
+
+def test_concat_frames_keeps_the_callers_list():
+    frames = [pa.table({'x': [1, 2]}), pa.table({'x': [3]})]
+
+    df = some_functions.concat_frames(frames)
+
+    assert df['x'].tolist() == [1, 2, 3]
+    assert len(frames) == 2
+
+
+def test_concat_frames_releases_the_list_on_request():
+    frames = [pa.table({'x': [1, 2]}), pd.DataFrame({'x': [3]})]
+
+    df = some_functions.concat_frames(frames, release_frames=True)
+
+    assert df['x'].tolist() == [1, 2, 3]
+    assert frames == []
+
+
+def test_concat_frames_takes_files_as_they_are_read():
+    read = []
+
+    def read_files():
+        for i in range(3):
+            read.append(i)
+            yield pa.table({'x': [i]})
+
+    null_stats = some_functions.NullStatsAccumulator()
+    df = some_functions.concat_frames(read_files(), null_stats=null_stats)
+
+    assert df['x'].tolist() == [0, 1, 2]
+    assert read == [0, 1, 2]
+    assert null_stats.rows == 3
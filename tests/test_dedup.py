@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import some_functions
+from conftest import orders_row, write_export
+
+KEYS = ['OrderIdsWebsiteID', 'OrderLineProductIdsWebsite', 'OrderLineStatusIdsExternalId']
+
+
+def orders(ids, products, statuses):
+    return pd.DataFrame({'OrderIdsWebsiteID': ids, 'OrderLineProductIdsWebsite': products,
+                         'OrderLineStatusIdsExternalId': statuses, 'OrderTotalPrice': np.arange(len(ids), dtype=float)})
+
+
+def test_keys_are_compared_with_earlier_files_only():
+    first = orders(['1', '1', '2'], ['a', 'a', 'b'], ['paid'] * 3)
+    second = orders(['1', '3', '3'], ['a', 'c', 'c'], ['paid'] * 3)
+
+    df = some_functions.concat_frames([pa.Table.from_pandas(first), pa.Table.from_pandas(second)], key_columns=KEYS)
+
+    # The repeated line inside the first file is kept, the line repeated in the second file is removed
+    assert df['OrderIdsWebsiteID'].tolist() == ['1', '1', '2', '3', '3']
+
+
+def test_rows_without_a_key_are_compared_by_all_columns():
+    first = orders([None, None], ['a', 'a'], ['paid', 'paid'])
+    second = orders([None, None], ['a', 'b'], ['paid', 'paid'])
+    second['OrderTotalPrice'] = [0.0, 5.0]
+
+    df = some_functions.concat_frames([first, second], key_columns=KEYS)
+
+    assert df['OrderLineProductIdsWebsite'].tolist() == ['a', 'a', 'b']
+
+
+def test_chunks_of_one_file_do_not_remove_each_other():
+    seen_keys = some_functions.KeyIndex()
+    file_keys = some_functions.KeyIndex()
+    chunks = [orders(['1'], ['a'], ['paid']), orders(['1'], ['a'], ['paid'])]
+
+    kept = [some_functions.drop_seen_keys(chunk, KEYS, seen_keys, file_keys)[1] for chunk in chunks]
+    seen_keys.merge(file_keys)
+
+    assert kept == [0, 0]
+    assert some_functions.drop_seen_keys(chunks[0], KEYS, seen_keys)[1] == 1
+
+
+def test_integer_keys_are_hashed_as_integers():
+    keys = ['CustomerActionIdsMindboxId']
+    from_file = pd.DataFrame({'CustomerActionIdsMindboxId': np.array([101, 102], dtype='int64')})
+    # Read back from the database with a missing value the column becomes float
+    from_database = pd.DataFrame({'CustomerActionIdsMindboxId': [101.0, 102.0, np.nan]})
+
+    hashes = some_functions.hash_keys(from_file, keys)
+
+    assert hashes.tolist() == some_functions.hash_keys(from_database, keys)[:2].tolist()
+    assert hashes.tolist() == pd.util.hash_pandas_object(from_file, index=False).tolist()
+
+
+def test_customer_key_is_cast_to_integer():
+    transform = some_functions.compile_transforms(some_functions.CUSTOMERS_TRANSFORMS)
+    df = transform(pd.DataFrame({'CustomerActionIdsMindboxId': ['101', '102'],
+                                 'CustomerActionChannelIdsMindboxId': ['7', '7']}))
+
+    assert df['CustomerActionIdsMindboxId'].dtype == 'int64'
+
+
+def test_streamed_keys_have_one_type_in_every_chunk(load_path, tmp_path):
+    columns = list(some_functions.ORDERS_SCHEMA)
+    # Pandas reads the IDs of the first chunk as integers and of the second one as text
+    write_export(os.path.join(load_path, 'orders_q1.csv'), columns,
+                 [orders_row(1001, OrderLineProductIdsWebsite=55), orders_row(1002, OrderLineProductIdsWebsite=56)])
+    write_export(os.path.join(load_path, 'orders_q2.csv'), columns,
+                 [orders_row(1001, OrderLineProductIdsWebsite=55), orders_row('A-7', OrderLineProductIdsWebsite='x')])
+
+    rows = some_functions.stream_files_to_sql(load_path, str(tmp_path / 'aif.sql'), chunksize=2)
+
+    _, _, _, other_dataframes = some_functions.read_and_sort_files(load_path)
+    df = some_functions.concat_frames(other_dataframes, key_columns=KEYS)
+    assert rows['orders'] == len(df) == 3
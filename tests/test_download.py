@@ -0,0 +1,135 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+
+import some_functions
+from conftest import FakeAsyncYaDisk
+
+
+def list_files(disk):
+    return list(some_functions.iter_disk_files(disk))
+
+
+def test_download_files_concurrently(disk, put_file, load_path):
+    for name in ('a.csv', 'b.csv', 'c.csv'):
+        put_file(name, f'x;y\n{name};1\n')
+
+    results = some_functions.download_files_concurrently(disk, list_files(disk), load_path, backoff=0)
+
+    assert sorted(result['file'] for result in results) == ['a.csv', 'b.csv', 'c.csv']
+    for name in ('a.csv', 'b.csv', 'c.csv'):
+        with open(os.path.join(load_path, name), encoding='utf-8') as file:
+            assert file.read() == f'x;y\n{name};1\n'
+    assert not [name for name in os.listdir(load_path) if name.endswith('.part')]
+
+
+def test_download_is_retried_after_failure(disk, put_file, load_path):
+    put_file('a.csv', 'x;y\n1;2\n')
+    disk.failures['a.csv'] = 2
+
+    results = some_functions.download_files_concurrently(disk, list_files(disk), load_path, backoff=0)
+
+    assert results[0]['attempts'] == 3
+    assert os.path.exists(os.path.join(load_path, 'a.csv'))
+
+
+def test_download_with_wrong_hash_is_not_saved(disk, put_file, load_path):
+    put_file('a.csv', 'x;y\n1;2\n')
+    put_file('b.csv', 'x;y\n3;4\n')
+    disk.md5_overrides['b.csv'] = '0' * 32
+    manifest = {'files': {}}
+
+    results = some_functions.download_and_record_files(disk, list_files(disk), load_path, manifest)
+
+    assert [result['file'] for result in results] == ['a.csv']
+    assert sorted(os.listdir(load_path)) == ['a.csv']
+    assert list(manifest['files']) == ['a.csv']
+
+
+def test_extract_files_async(disk, put_file, load_path):
+    put_file('a.csv', 'x;y\n1;2\n')
+    put_file('b.csv', 'x;y\n3;4\n')
+    disk.failures['b.csv'] = 1
+
+    async def run():
+        return await some_functions.extract_files_async(FakeAsyncYaDisk(disk), load_path, backoff=0)
+
+    dobro_files, other_files, dobro_dataframes, other_dataframes = asyncio.run(run())
+
+    assert (dobro_files, other_files) == ([], ['a.csv', 'b.csv'])
+    assert [table.column('y').to_pylist() for table in other_dataframes] == [[2], [4]]
+    assert disk.link_requests.count('b.csv') == 2
+    assert sorted(some_functions.load_manifest(load_path)['files']) == ['a.csv', 'b.csv']
+
+
+def test_extract_files_async_skips_unchanged_files(disk, put_file, load_path):
+    put_file('a.csv', 'x;y\n1;2\n')
+
+    async def run():
+        return await some_functions.extract_files_async(FakeAsyncYaDisk(disk), load_path, backoff=0)
+
+    asyncio.run(run())
+    asyncio.run(run())
+
+    assert disk.link_requests == ['a.csv']
+
+
+def test_run_coroutine_inside_running_loop():
+    async def answer():
+        return 42
+
+    async def notebook_cell():
+        return some_functions.run_coroutine(answer())
+
+    assert some_functions.run_coroutine(answer()) == 42
+    assert asyncio.run(notebook_cell()) == 42
+
+
+def test_run_is_not_marked_successful_after_failed_download(disk, put_file, load_path):
+    put_file('a.csv', 'x;y\n1;2\n')
+    put_file('b.csv', 'x;y\n3;4\n')
+    disk.failures['b.csv'] = 10
+    started_at = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+    some_functions.check_and_update_files(disk, list_files(disk), load_path)
+
+    assert some_functions.load_manifest(load_path)['failed_files'] == {'b.csv': 'disk:/aif_etl/b.csv'}
+    assert not some_functions.mark_successful_run(load_path, started_at)
+    assert some_functions.get_last_successful_run(load_path) is None
+
+    disk.failures.clear()
+    some_functions.check_and_update_files(disk, list_files(disk), load_path)
+
+    assert some_functions.mark_successful_run(load_path, started_at)
+    assert some_functions.get_last_successful_run(load_path) == started_at
+
+
+def test_download_time_includes_failed_attempts(disk, put_file, load_path, monkeypatch):
+    put_file('a.csv', 'x;y\n1;2\n')
+    disk.failures['a.csv'] = 2
+    clock = [0.0]
+    monkeypatch.setattr('time.perf_counter', lambda: clock[0])
+    monkeypatch.setattr('time.sleep', lambda seconds: clock.__setitem__(0, clock[0] + seconds))
+
+    result = some_functions.download_file_with_retry(disk, disk.entry('a.csv'), os.path.join(load_path, 'a.csv'))
+
+    # Two failed attempts are followed by retries in 1 and 2 seconds
+    assert result['attempts'] == 3
+    assert result['seconds'] == 3
+
+
+def test_updated_and_new_files_are_downloaded_in_one_pool(disk, put_file, load_path, monkeypatch):
+    put_file('a.csv', 'x;y\n1;2\n')
+    some_functions.check_and_update_files(disk, list_files(disk), load_path)
+    put_file('a.csv', 'x;y\n1;3\n')
+    put_file('b.csv', 'x;y\n3;4\n')
+    calls = []
+    download_files_concurrently = some_functions.download_files_concurrently
+    monkeypatch.setattr(some_functions, 'download_files_concurrently',
+                        lambda y, files, *args, **kwargs: calls.append(sorted(os.path.basename(el['path'])
+                                                                              for el in files))
+                        or download_files_concurrently(y, files, *args, **kwargs))
+
+    some_functions.check_and_update_files(disk, list_files(disk), load_path)
+
+    assert calls == [['a.csv', 'b.csv']]
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+
+import pyarrow.feather
+import pyarrow.parquet
+import pytest
+
+import some_functions
+from conftest import customers_row, write_export
+
+pytest.importorskip('duckdb')
+
+
+@pytest.fixture
+def export_path(tmp_path):
+    path = tmp_path / 'aif_etl'
+    path.mkdir()
+    columns = list(some_functions.CUSTOMERS_SCHEMA)
+    write_export(str(path / 'dobro_1.csv'), columns, [customers_row(1), customers_row(2)])
+    # Overlapping export: action 102 is repeated and is loaded once
+    write_export(str(path / 'dobro_2.csv'), columns, [customers_row(2), customers_row(3)])
+    table = some_functions.read_export_table(str(path / 'dobro_2.csv'))
+    os.remove(path / 'dobro_2.csv')
+    pyarrow.feather.write_feather(table.slice(1), str(path / 'dobro_3.feather'))
+    pyarrow.parquet.write_table(table.slice(0, 1), str(path / 'dobro_4.parquet'))
+    write_export(str(path / 'orders.csv'), list(some_functions.ORDERS_SCHEMA),
+                 [{'OrderCustomerIdsMindboxId': 1001, 'OrderIdsWebsiteID': 'o1', 'OrderLineProductIdsWebsite': 'p',
+                   'OrderTotalPrice': '100', 'OrderFirstActionDateTimeUtc': '2024-03-11 10:00:00'}])
+    return str(path)
+
+
+def read_table(db_path, table_name):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(f'SELECT * FROM {table_name}').fetchall(), \
+            [row[1] for row in conn.execute(f'PRAGMA table_info({table_name})')]
+
+
+@pytest.mark.parametrize('use_extension', [True, False])
+def test_duckdb_load_to_sql(export_path, tmp_path, monkeypatch, use_extension):
+    if not use_extension:
+        monkeypatch.setattr(some_functions, 'attach_sqlite_database', lambda con, db_path: False)
+    db_path = str(tmp_path / 'aif.sql')
+
+    rows = some_functions.duckdb_load_to_sql(export_path, db_path, memory_limit='256MB')
+
+    assert rows == {'customers': 3, 'orders': 1}
+    customers, columns = read_table(db_path, 'customers')
+    action_ids = sorted(row[columns.index('CustomerActionIdsMindboxId')] for row in customers)
+    assert action_ids == [101, 102, 103]
+    assert 'CustomerActionChannelIdsExternalId' not in columns
+    orders, columns = read_table(db_path, 'orders')
+    assert orders[0][columns.index('OrderTotalPrice')] == 100.0
+
+
+def test_pickle_files_are_reported_unless_allowed(export_path, tmp_path, capsys):
+    some_functions.read_export_table(os.path.join(export_path, 'dobro_1.csv')).to_pandas().to_pickle(
+        os.path.join(export_path, 'dobro_0.pkl'))
+
+    rows = some_functions.duckdb_load_to_sql(export_path, str(tmp_path / 'aif.sql'))
+
+    assert "Error reading file 'dobro_0.pkl'" in capsys.readouterr().out
+    assert rows['customers'] == 3
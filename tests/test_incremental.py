@@ -0,0 +1,84 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+import some_functions
+from conftest import customers_row, orders_row, write_export
+
+
+def load(load_path, db_path):
+    some_functions.stream_files_to_sql(load_path, db_path, incremental=True)
+    with sqlite3.connect(db_path) as conn:
+        return pd.read_sql('SELECT * FROM orders ORDER BY OrderIdsWebsiteID', conn)
+
+
+def test_duplicates_are_loaded_again_after_file_is_removed(load_path, tmp_path):
+    db_path = str(tmp_path / 'aif.sql')
+    columns = list(some_functions.ORDERS_SCHEMA)
+    write_export(os.path.join(load_path, 'orders_1.csv'), columns, [orders_row(1), orders_row(2)])
+    write_export(os.path.join(load_path, 'orders_2.csv'), columns, [orders_row(2), orders_row(3)])
+
+    df = load(load_path, db_path)
+    assert df['SourceFile'].tolist() == ['orders_1.csv', 'orders_1.csv', 'orders_2.csv']
+
+    os.remove(os.path.join(load_path, 'orders_1.csv'))
+    df = load(load_path, db_path)
+
+    # Order 2 was loaded from the first file only; it comes back from the second one
+    assert df['OrderIdsWebsiteID'].astype(str).tolist() == ['2', '3']
+    assert df['SourceFile'].tolist() == ['orders_2.csv', 'orders_2.csv']
+
+
+def test_file_with_new_column_is_appended(load_path, tmp_path):
+    db_path = str(tmp_path / 'aif.sql')
+    columns = list(some_functions.ORDERS_SCHEMA)
+    write_export(os.path.join(load_path, 'orders_1.csv'), columns, [orders_row(1)])
+    load(load_path, db_path)
+
+    write_export(os.path.join(load_path, 'orders_2.csv'), columns + ['OrderPromoCode'],
+                 [orders_row(2, OrderPromoCode='SPRING')])
+    df = load(load_path, db_path)
+
+    assert df['OrderIdsWebsiteID'].astype(str).tolist() == ['1', '2']
+    assert df['OrderPromoCode'].isna().tolist() == [True, False]
+    assert df['OrderPromoCode'].iloc[1] == 'SPRING'
+
+
+def test_customer_keys_loaded_earlier_are_not_loaded_again(load_path, tmp_path):
+    db_path = str(tmp_path / 'aif.sql')
+    columns = list(some_functions.CUSTOMERS_SCHEMA)
+    write_export(os.path.join(load_path, 'customers_1.csv'), columns, [customers_row(1), customers_row(2)])
+    some_functions.stream_files_to_sql(load_path, db_path, incremental=True)
+
+    write_export(os.path.join(load_path, 'customers_2.csv'), columns, [customers_row(2), customers_row(3)])
+    some_functions.stream_files_to_sql(load_path, db_path, incremental=True)
+
+    with sqlite3.connect(db_path) as conn:
+        df = pd.read_sql('SELECT * FROM customers ORDER BY CustomerActionIdsMindboxId', conn)
+    assert df['CustomerActionIdsMindboxId'].tolist() == [101, 102, 103]
+    assert df['SourceFile'].tolist() == ['customers_1.csv', 'customers_1.csv', 'customers_2.csv']
+
+
+def test_incremental_load_after_full_load(load_path, tmp_path):
+    db_path = str(tmp_path / 'aif.sql')
+    columns = list(some_functions.ORDERS_SCHEMA)
+    write_export(os.path.join(load_path, 'orders_1.csv'), columns, [orders_row(1)])
+    load(load_path, db_path)
+    some_functions.stream_files_to_sql(load_path, db_path)
+
+    write_export(os.path.join(load_path, 'orders_2.csv'), columns, [orders_row(2)])
+    df = load(load_path, db_path)
+
+    assert df['OrderIdsWebsiteID'].astype(str).tolist() == ['1', '2']
+    assert df['SourceFile'].tolist() == ['orders_1.csv', 'orders_2.csv']
+
+
+def test_full_load_replaces_view_of_lookup_tables(load_path, tmp_path):
+    db_path = str(tmp_path / 'aif.sql')
+    write_export(os.path.join(load_path, 'orders_1.csv'), list(some_functions.ORDERS_SCHEMA), [orders_row(1)])
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('CREATE TABLE orders_data (OrderIdsWebsiteID TEXT)')
+        conn.execute('CREATE VIEW orders AS SELECT * FROM orders_data')
+
+    assert some_functions.stream_files_to_sql(load_path, db_path)['orders'] == 1
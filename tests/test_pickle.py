@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+import some_functions
+
+
+@pytest.fixture
+def pickle_path(tmp_path):
+    file_path = str(tmp_path / 'other.pkl')
+    pd.DataFrame({'x': [1, 2]}).to_pickle(file_path)
+    return file_path
+
+
+def test_pickle_files_are_not_read_by_default(pickle_path):
+    with pytest.raises(ValueError, match='pickle'):
+        some_functions.read_export_table(pickle_path)
+
+
+def test_pickle_files_are_read_when_allowed(pickle_path, monkeypatch):
+    monkeypatch.setattr(some_functions, 'READ_PICKLE_FILES', False)
+    some_functions.allow_pickle_files()
+
+    assert some_functions.read_export_table(pickle_path).column('x').to_pylist() == [1, 2]
+
+
+def test_setting_is_passed_to_worker_processes(tmp_path, pickle_path, monkeypatch):
+    monkeypatch.setattr(some_functions, 'READ_PICKLE_FILES', True)
+
+    tables = some_functions.read_files_as_tables(str(tmp_path), ['other.pkl'], max_workers=1)
+
+    assert [file for file, table in tables] == ['other.pkl']
@@ -0,0 +1,53 @@
+import os
+
+import pyarrow as pa
+
+import some_functions
+from conftest import customers_row, write_export
+
+
+def test_read_schema_conforming_customers_export(tmp_path):
+    file_path = str(tmp_path / 'dobro_1.csv')
+    write_export(file_path, list(some_functions.CUSTOMERS_SCHEMA), [customers_row(1), customers_row(2)])
+
+    table = some_functions.read_export_table(file_path)
+
+    assert some_functions.classify_file(file_path) == 'customers'
+    assert table.num_rows == 2
+    assert table.schema.field('CustomerActionIdsMindboxId').type == pa.int64()
+    assert table.schema.field('CustomerActionDateTimeUtc').type == pa.timestamp('ns')
+    assert table.column('CustomerActionDateTimeUtc').to_pylist()[0].isoformat() == '2024-03-11T10:00:00'
+    for col in some_functions.CUSTOMERS_COLUMNS_TO_DROP:
+        assert col not in table.column_names
+
+
+def test_bad_values_become_missing_instead_of_failing_the_file(tmp_path):
+    file_path = str(tmp_path / 'dobro_1.csv')
+    rows = [customers_row(1),
+            customers_row(2, CustomerActionChannelIdsMindboxId='n/a', CustomerActionDateTimeUtc='15.03.2024 10:00'),
+            customers_row(3, CustomerActionCreationDateTimeUtc='never')]
+    write_export(file_path, list(some_functions.CUSTOMERS_SCHEMA), rows)
+
+    table = some_functions.read_export_table(file_path)
+
+    assert table.num_rows == 3
+    assert table.schema.field('CustomerActionChannelIdsMindboxId').type == pa.int64()
+    assert table.column('CustomerActionChannelIdsMindboxId').to_pylist() == [7, None, 7]
+    assert table.column('CustomerActionIdsMindboxId').to_pylist() == [101, 102, 103]
+    assert table.column('CustomerActionDateTimeUtc').to_pylist()[1].isoformat() == '2024-03-15T10:00:00'
+    assert table.column('CustomerActionCreationDateTimeUtc').null_count == 3
+
+
+def test_bad_boolean_value_in_orders_export(tmp_path):
+    file_path = str(tmp_path / 'orders.csv')
+    columns = list(some_functions.ORDERS_SCHEMA)
+    rows = [{'OrderCustomerIdsMindboxId': 1, 'OrderCustomFieldsNewyear': 'true', 'OrderTotalPrice': '100.5'},
+            {'OrderCustomerIdsMindboxId': 2, 'OrderCustomFieldsNewyear': 'maybe', 'OrderTotalPrice': '200'}]
+    write_export(file_path, columns, rows)
+
+    table = some_functions.read_export_table(file_path)
+
+    assert some_functions.classify_file(file_path) == 'orders'
+    assert table.column('OrderCustomFieldsNewyear').to_pylist() == [True, None]
+    assert table.column('OrderTotalPrice').to_pylist() == [100.5, 200.0]
+    assert 'OrderDeliveryCost' not in table.column_names
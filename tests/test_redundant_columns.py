@@ -0,0 +1,69 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+import some_functions
+
+
+def test_mapped_and_identical_columns_are_found():
+    df = pd.DataFrame({'ChannelId': [1, 2, 1, 3], 'ChannelName': ['vk', 'site', 'vk', 'mail'],
+                       'ChannelCopy': [1, 2, 1, 3], 'Amount': [10, 10, 20, 30]})
+
+    assert some_functions.find_redundant_columns(df) == ['ChannelName', 'ChannelCopy']
+
+
+def test_unique_columns_are_not_mapped_to_each_other():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'ActionId': np.arange(1000), 'Random': rng.permutation(1000),
+                       'ActionIdCopy': np.arange(1000)})
+
+    assert some_functions.find_redundant_columns(df) == ['ActionIdCopy']
+
+
+def test_protected_columns_are_kept():
+    df = pd.DataFrame({'ChannelId': [1, 2, 1], 'ChannelName': ['vk', 'site', 'vk']})
+
+    assert some_functions.find_redundant_columns(df, protected=['ChannelName']) == ['ChannelId']
+    assert some_functions.find_redundant_columns(df, protected=['ChannelId', 'ChannelName']) == []
+
+
+def test_columns_of_sql_queries_are_protected():
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sqls_script.py')
+    with open(script, encoding='utf-8') as file:
+        text = file.read()
+    columns = {**some_functions.CUSTOMERS_SCHEMA, **some_functions.ORDERS_SCHEMA}
+
+    used = [col for col in columns if re.search(rf'\b{col}\b', text)]
+
+    assert 'CustomerActionChannelUtmSource' in used
+    assert set(used) <= set(some_functions.COLUMNS_USED_IN_QUERIES)
+
+
+def test_utm_source_mapped_to_campaign_is_kept():
+    df = pd.DataFrame({'CustomerActionChannelUtmCampaign': ['spring', 'autumn', 'spring', 'winter'],
+                       'CustomerActionChannelUtmSource': ['vk', 'mail', 'vk', 'site']})
+
+    assert some_functions.find_redundant_columns(df, some_functions.COLUMNS_USED_IN_QUERIES) == \
+        ['CustomerActionChannelUtmCampaign']
+
+
+def test_every_column_is_hashed_once(monkeypatch):
+    df = pd.DataFrame({f'col{i}': np.arange(100) % 7 for i in range(6)})
+    hashed = []
+    hash_pandas_object = pd.util.hash_pandas_object
+    monkeypatch.setattr(pd.util, 'hash_pandas_object',
+                        lambda values, **kwargs: hashed.append(values.name) or hash_pandas_object(values, **kwargs))
+
+    assert some_functions.find_redundant_columns(df) == ['col1', 'col2', 'col3', 'col4', 'col5']
+    assert sorted(hashed) == list(df.columns)
+
+
+def test_dropped_cast_columns_are_not_reported_as_changed():
+    spec = some_functions.with_dropped_columns(some_functions.CUSTOMERS_TRANSFORMS, ['CustomerActionChannelIdsMindboxId'])
+
+    removed, changed = some_functions.report_transforms(spec, list(some_functions.CUSTOMERS_SCHEMA))
+
+    assert 'CustomerActionChannelIdsMindboxId' in removed
+    assert 'CustomerActionChannelIdsMindboxId' not in changed
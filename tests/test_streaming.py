@@ -0,0 +1,72 @@
+import os
+
+import pyarrow as pa
+import pytest
+
+import some_functions
+from conftest import customers_row, write_export
+
+
+def list_files(disk):
+    return list(some_functions.iter_disk_files(disk))
+
+
+def test_read_disk_files_streaming(disk, put_file, load_path):
+    put_file('a.csv', 'x;y\n1;2\n3;4\n')
+    put_file('b.csv', 'x;y\n5;6\n')
+
+    dobro_files, other_files, dobro_dataframes, other_dataframes = some_functions.read_disk_files_streaming(
+        disk, list_files(disk), load_path)
+
+    assert other_files == ['a.csv', 'b.csv']
+    assert all(isinstance(table, pa.Table) for table in other_dataframes)
+    assert some_functions.concat_frames(other_dataframes)['y'].tolist() == [2, 4, 6]
+    assert sorted(os.listdir(load_path)) == ['a.csv', 'b.csv', 'manifest.json']
+
+
+def test_stream_removes_part_file_when_hash_does_not_match(disk, put_file, load_path):
+    put_file('a.csv', 'x;y\n1;2\n')
+    disk.md5_overrides['a.csv'] = '0' * 32
+    tee_path = os.path.join(load_path, 'a.csv')
+
+    with pytest.raises(ValueError):
+        list(some_functions.stream_csv_from_disk(disk, list_files(disk)[0], tee_path=tee_path, engine='pyarrow'))
+
+    assert os.listdir(load_path) == []
+
+
+def test_stream_removes_part_file_when_not_read_to_the_end(disk, put_file, load_path):
+    put_file('a.csv', 'x;y\n' + '1;2\n' * 1000)
+    tee_path = os.path.join(load_path, 'a.csv')
+
+    stream = some_functions.stream_csv_from_disk(disk, list_files(disk)[0], chunksize=10, tee_path=tee_path)
+    next(stream)
+    stream.close()
+
+    assert os.listdir(load_path) == []
+
+
+def test_failed_stream_is_kept_for_the_next_run(disk, put_file, load_path):
+    put_file('a.csv', 'x;y\n1;2\n')
+    disk.md5_overrides['a.csv'] = '0' * 32
+
+    some_functions.read_disk_files_streaming(disk, list_files(disk), load_path)
+
+    assert os.listdir(load_path) == ['manifest.json']
+    assert some_functions.load_manifest(load_path)['failed_files'] == {'a.csv': 'disk:/aif_etl/a.csv'}
+
+
+def test_stream_customers_export_with_declared_types(disk, remote_path, load_path):
+    columns = list(some_functions.CUSTOMERS_SCHEMA)
+    write_export(os.path.join(remote_path, 'dobro_1.csv'), columns, [customers_row(1), customers_row(2)])
+    write_export(os.path.join(remote_path, 'dobro_2.csv'), columns,
+                 [customers_row(3, CustomerActionChannelIdsMindboxId='n/a')])
+
+    dobro_files, other_files, dobro_dataframes, other_dataframes = some_functions.read_disk_files_streaming(
+        disk, list_files(disk), load_path)
+
+    assert dobro_files == ['dobro_1.csv', 'dobro_2.csv']
+    customers = some_functions.concat_frames(dobro_dataframes)
+    assert customers['CustomerActionIdsMindboxId'].tolist() == [101, 102, 103]
+    assert customers['CustomerActionChannelIdsMindboxId'].isna().tolist() == [False, False, True]
+    assert str(customers['CustomerActionDateTimeUtc'].dtype) == 'datetime64[ns]'
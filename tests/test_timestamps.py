@@ -0,0 +1,49 @@
+import pandas as pd
+
+import some_functions
+
+
+def test_values_in_unknown_formats_are_parsed_one_by_one():
+    values = pd.Series(['03/15/2024 10:00', '2024.03.16 11:00', '16-03-2024 11:00', '2024-03-17 12:00:00', 'never'])
+
+    result = some_functions.parse_timestamps(values)
+
+    assert str(result.dtype) == 'datetime64[ns]'
+    assert result.dt.strftime('%Y-%m-%d %H:%M').tolist()[:4] == ['2024-03-15 10:00', '2024-03-16 11:00',
+                                                                 '2024-03-16 11:00', '2024-03-17 12:00']
+    assert pd.isna(result.iloc[4])
+
+
+def test_timezones_are_converted_to_utc():
+    result = some_functions.parse_timestamps(pd.Series(['2024-03-15T10:00:00+0300', '2024-03-15']))
+
+    assert result.dt.strftime('%Y-%m-%d %H:%M').tolist() == ['2024-03-15 07:00', '2024-03-15 00:00']
+
+
+def test_cache_reuses_values_parsed_in_earlier_chunks(monkeypatch):
+    cache = some_functions.TimestampCache()
+    first = some_functions.parse_timestamps(pd.Series(['2024-03-15 10:00:00', '03/15/2024 10:00']), cache=cache)
+
+    parsed = []
+    to_datetime = pd.to_datetime
+    monkeypatch.setattr(pd, 'to_datetime', lambda values, **kwargs: parsed.extend(values) or to_datetime(values, **kwargs))
+    second = some_functions.parse_timestamps(pd.Series(['03/15/2024 10:00', '2024-03-16 10:00:00']), cache=cache)
+
+    assert set(parsed) == {'2024-03-16 10:00:00'}
+    assert second.iloc[0] == first.iloc[1]
+    assert len(cache.values) == 3
+
+
+def test_cache_is_cleared_beyond_its_size():
+    cache = some_functions.TimestampCache(max_size=2)
+    some_functions.parse_timestamps(pd.Series(['2024-03-15', '2024-03-16']), cache=cache)
+    some_functions.parse_timestamps(pd.Series(['2024-03-17']), cache=cache)
+
+    assert len(cache.values) <= 2
+
+
+def test_column_without_values():
+    result = some_functions.parse_timestamps(pd.Series([None, None], dtype=object), cache=some_functions.TimestampCache())
+
+    assert result.dtype == 'datetime64[ns]'
+    assert result.isna().all()